@@ -1,12 +1,15 @@
 ﻿import os
-import sys
 from datetime import datetime, timezone, timedelta
-from functools import wraps
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import json
+import time
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_mail import Mail, Message
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
@@ -14,17 +17,15 @@ from flask_wtf import FlaskForm, CSRFProtect
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, DateField, TimeField, SubmitField, BooleanField, SelectField, IntegerField, PasswordField
 from wtforms.validators import DataRequired, Length, Optional, URL, Email, NumberRange, EqualTo
-from werkzeug.utils import secure_filename
+from markupsafe import escape
 from dotenv import load_dotenv
 import csv
 import io
 import base64
 import secrets
-from uuid import uuid4
 from utils.storage import StorageManager
 from utils.quiz_performance import (
-    QuizPerformanceManager, QuizStatsCollector, QuizQueryOptimizer,
-    prevent_double_submission, rate_limit_quiz_joins
+    QuizPerformanceManager, QuizStatsCollector, rate_limit_quiz_joins
 )
 import tempfile
 
@@ -36,8 +37,18 @@ except ImportError:
     PDFKIT_AVAILABLE = False
     print("⚠️ pdfkit not available - PDF generation will be disabled")
 
+try:
+    from reportlab.lib.colors import HexColor
+    # Certificate palette - parsed once at import instead of on every canvas call
+    CERT_BLUE = HexColor('#0078d4')
+    CERT_DARK = HexColor('#323130')
+    CERT_GREY = HexColor('#605e5c')
+except ImportError:
+    CERT_BLUE = CERT_DARK = CERT_GREY = None
+
 import qrcode
 from io import BytesIO
+from queue import LifoQueue, Empty, Full
 
 load_dotenv(override=True)
 
@@ -46,7 +57,6 @@ storage_manager = StorageManager()
 
 # CRITICAL: Specify static and template folders
 # Set instance_path to temp directory for serverless environments to avoid read-only filesystem errors
-import tempfile
 # Always use temp directory for instance path to prevent read-only filesystem errors
 app = Flask(__name__,
             static_folder='static',
@@ -72,11 +82,16 @@ if database_url:
     
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     
-    # Simplified connection pool for serverless
+    # Connection pool: serverless instances (Vercel) keep the minimal 1-connection pool,
+    # long-running multi-threaded servers can raise it via DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    # pool_recycle drops connections before the Supabase pooler closes idle ones (300s);
+    # pool_timeout fails fast on an exhausted pool instead of queueing requests for 30s
+    is_serverless = bool(os.getenv('VERCEL'))
     app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_size': 1,
-        'max_overflow': 0,
-        'pool_timeout': 30,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 1 if is_serverless else 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 0 if is_serverless else 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': 280,
         'pool_pre_ping': True,
     }
     print(f"Using PostgreSQL/Supabase with pg8000 driver")
@@ -89,6 +104,9 @@ else:
     }
     print("Using SQLite for local development")
 
+# Postgres-only SQL (writable CTEs, ON CONFLICT, ...) is gated on this
+IS_POSTGRES = bool(database_url)
+
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Email configuration with enhanced production support
@@ -328,19 +346,21 @@ def test_email_connection():
         print(f"❌ Email connection test failed: {str(e)}")
         return False
 
-def _build_ticket_message(participant, event):
-    """Build email Message object for a participant ticket (no sending)."""
+def _build_ticket_message(participant, event, template=None):
+    """Build email Message object for a participant ticket (no sending).
+
+    Batch senders pass a pre-fetched ``template`` so the Jinja lookup happens once.
+    """
     subject = f"Registration Confirmation - Your Ticket for {event.name}"
     calendar_url = generate_google_calendar_url(event, participant)
+    context = dict(event=event, participant=participant, calendar_url=calendar_url)
 
     msg = Message(
         subject=subject,
         sender=app.config['MAIL_DEFAULT_SENDER'],
         recipients=[participant.email],
-        html=render_template('email/ticket_email.html',
-                             event=event,
-                             participant=participant,
-                             calendar_url=calendar_url)
+        html=template.render(**context) if template is not None
+             else render_template('email/ticket_email.html', **context)
     )
 
     # Attach .ics calendar file (non-critical)
@@ -371,8 +391,8 @@ def _build_ticket_message(participant, event):
     return msg
 
 
-def send_ticket_email(participant, event, connection=None):
-    """Send individual ticket email. Optionally reuse an open SMTP connection."""
+def send_ticket_email(participant, event, connection=None, template=None):
+    """Send individual ticket email. Optionally reuse an open SMTP connection and template."""
     try:
         # Validate config once
         required_configs = ['MAIL_USERNAME', 'MAIL_PASSWORD', 'MAIL_DEFAULT_SENDER']
@@ -380,7 +400,7 @@ def send_ticket_email(participant, event, connection=None):
         if missing_configs:
             raise Exception(f"Missing email config: {', '.join(missing_configs)}")
 
-        msg = _build_ticket_message(participant, event)
+        msg = _build_ticket_message(participant, event, template=template)
 
         # Send via existing connection or create a new one
         if connection:
@@ -409,11 +429,13 @@ def send_emails_batch(participants, event, on_progress=None):
     """
     sent = 0
     errors = []
+    # Resolve the compiled ticket template once instead of per message
+    template = app.jinja_env.get_template('email/ticket_email.html')
 
     with mail.connect() as conn:
         for i, participant in enumerate(participants):
             try:
-                success = send_ticket_email(participant, event, connection=conn)
+                success = send_ticket_email(participant, event, connection=conn, template=template)
                 if success:
                     # Commit this participant's email_sent=True immediately
                     db.session.commit()
@@ -430,6 +452,26 @@ def send_emails_batch(participants, event, on_progress=None):
     return sent, len(errors), errors
 
 
+# Bulk ticket emails run off the request thread on long-running servers so a large
+# send doesn't hold a worker for minutes. Serverless functions (Vercel) are frozen
+# once the response is returned, so there the send stays inline.
+_email_executor = None if os.getenv('VERCEL') else ThreadPoolExecutor(max_workers=4, thread_name_prefix='email')
+
+
+def _send_ticket_emails_job(event_id, participant_ids):
+    """Background job: send ticket emails to the given participants (own app context/session)."""
+    with app.app_context():
+        try:
+            event = db.session.get(Event, event_id)
+            participants = Participant.query.filter(
+                Participant.id.in_(participant_ids)
+            ).order_by(Participant.id.asc()).all()
+            sent_count, error_count, _ = send_emails_batch(participants, event)
+            print(f"📧 Background send for event {event_id}: {sent_count} sent, {error_count} failed")
+        except Exception as e:
+            print(f"❌ Background email send failed for event {event_id}: {e}")
+
+
 def generate_google_calendar_url(event, participant=None):
     """Generate a Google Calendar 'Add to Calendar' URL for an event."""
     from urllib.parse import quote
@@ -554,13 +596,14 @@ def generate_ics_content(event, participant=None):
     return ics
 
 
-def send_reminder_email(participant, event, is_tomorrow=False):
+def send_reminder_email(participant, event, is_tomorrow=False, connection=None):
     """Send event reminder email to a participant.
     
     Args:
         participant: Participant object
         event: Event object
         is_tomorrow: True if event is tomorrow, False for general upcoming reminder
+        connection: Optional open SMTP connection (from mail.connect()) to reuse
     """
     try:
         print(f"🔔 Preparing reminder email for {participant.email}")
@@ -611,7 +654,10 @@ def send_reminder_email(participant, event, is_tomorrow=False):
             ics_content
         )
         
-        mail.send(msg)
+        if connection:
+            connection.send(msg)
+        else:
+            mail.send(msg)
         print(f"✅ Reminder sent to {participant.email}")
         return True
         
@@ -878,6 +924,7 @@ class Participant(db.Model):
         db.Index('ix_participants_event_created', 'event_id', 'created_at'),
         db.Index('ix_participants_name_trgm', 'name'),
         db.Index('ix_participants_email_trgm', 'email'),
+        db.Index('ix_participants_email_event', 'email', 'event_id'),
     )
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
@@ -1076,34 +1123,53 @@ class Quiz(db.Model):
     def is_ended(self):
         return self.quiz_end_time is not None
     
-    @property
-    def leaderboard_data(self):
-        """Get top participants with scores - improved sorting"""
-        from sqlalchemy import desc
+    @classmethod
+    def leaderboard_rows(cls, quiz_id, live=False, limit=50):
+        """Ranked leaderboard as lightweight rows - ranking and joins happen in SQL, no ORM objects
         
-        # Get all attempts with participant info, ordered properly with microsecond precision
-        attempts = QuizAttempt.query.filter_by(quiz_id=self.id, is_completed=True)\
-            .join(Participant)\
-            .order_by(desc(QuizAttempt.score), QuizAttempt.total_time_taken.asc(), QuizAttempt.completion_timestamp.asc())\
-            .all()
+        Completed attempts rank by score, total time, then completion timestamp (microsecond precision);
+        the live view (live=True) includes in-progress attempts and ranks by score, progress, then time.
+        """
+        from sqlalchemy import desc
         
-        return attempts[:50]  # Top 50 for full leaderboard
+        if live:
+            ordering = (desc(QuizAttempt.score), QuizAttempt.current_question.desc(), QuizAttempt.total_time_taken.asc())
+        else:
+            ordering = (desc(QuizAttempt.score), QuizAttempt.total_time_taken.asc(), QuizAttempt.completion_timestamp.asc())
+        
+        correct_count = db.select(db.func.count(QuizAnswer.id)).where(
+            QuizAnswer.attempt_id == QuizAttempt.id, QuizAnswer.is_correct == True
+        ).scalar_subquery()
+        
+        query = db.session.query(
+            QuizAttempt.id,
+            Participant.name.label('participant_name'),
+            Participant.email.label('participant_email'),
+            QuizAttempt.score,
+            QuizAttempt.current_question,
+            QuizAttempt.total_time_taken,
+            QuizAttempt.is_completed,
+            QuizAttempt.completed_at,
+            QuizAttempt.completion_timestamp,
+            correct_count.label('correct_count'),
+            db.func.row_number().over(order_by=ordering).label('rank')
+        ).join(Participant, Participant.id == QuizAttempt.participant_id)\
+            .filter(QuizAttempt.quiz_id == quiz_id)
+        if not live:
+            query = query.filter(QuizAttempt.is_completed == True)
+        
+        return query.order_by(*ordering).limit(limit).all()
     
     @property
-    def live_leaderboard_data(self):
-        """Get live leaderboard including in-progress attempts"""
-        from sqlalchemy import desc
-        
-        # Get all attempts (completed and in-progress) with participant info
-        attempts = QuizAttempt.query.filter_by(quiz_id=self.id)\
-            .join(Participant)\
-            .order_by(desc(QuizAttempt.score), QuizAttempt.current_question.desc(), QuizAttempt.total_time_taken.asc())\
-            .all()
-        
-        return attempts[:50]  # Top 50 for game master view
+    def leaderboard_data(self):
+        """Get top 50 completed participants with scores"""
+        return Quiz.leaderboard_rows(self.id)
 
 class QuizQuestion(db.Model):
     __tablename__ = 'quiz_questions'
+    __table_args__ = (
+        db.Index('ix_quiz_questions_quiz_order', 'quiz_id', 'question_order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
     
@@ -1150,6 +1216,10 @@ class QuizQuestion(db.Model):
 
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_quiz_participant', 'quiz_id', 'participant_id', unique=True),
+        db.Index('ix_quiz_attempts_quiz_completed', 'quiz_id', 'is_completed'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
     participant_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=False)
@@ -1183,14 +1253,16 @@ class QuizAttempt(db.Model):
     @property
     def rank_position(self):
         """Get rank position in leaderboard"""
-        leaderboard = self.quiz.leaderboard_data
-        for i, attempt in enumerate(leaderboard):
-            if attempt.id == self.id:
-                return i + 1
+        for row in Quiz.leaderboard_rows(self.quiz_id):
+            if row.id == self.id:
+                return row.rank
         return None
 
 class QuizAnswer(db.Model):
     __tablename__ = 'quiz_answers'
+    __table_args__ = (
+        db.Index('ix_quiz_answers_attempt_question', 'attempt_id', 'question_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('quiz_questions.id'), nullable=False)
@@ -1452,8 +1524,6 @@ User.set_password = set_password
 User.check_password = check_password
 
 # Authorization decorators
-from functools import wraps
-
 def require_login(f):
     """Decorator to require user login"""
     @wraps(f)
@@ -1512,8 +1582,6 @@ def require_approval_for_action(action_type):
 
 def handle_pending_action(action_type, request_obj, *args, **kwargs):
     """Handle creation of pending action for admin approval"""
-    import json
-    
     # Extract action data from request
     action_data = {
         'args': args,
@@ -1570,61 +1638,46 @@ def migrate_reset_tokens():
         return jsonify({'error': 'Unauthorized migration attempt'}), 403
     
     try:
-        # Import migration function
-        import sys
-        import importlib.util
+        if IS_POSTGRES:
+            # One idempotent statement - no catalog inspection, one round trip
+            with db.engine.begin() as connection:
+                connection.execute(db.text(
+                    'ALTER TABLE users '
+                    'ADD COLUMN IF NOT EXISTS reset_token VARCHAR(100), '
+                    'ADD COLUMN IF NOT EXISTS reset_token_expires TIMESTAMP'
+                ))
+            return jsonify({
+                'status': 'success',
+                'message': 'Password reset token migration completed successfully!',
+                'results': ['Ensured reset_token and reset_token_expires columns']
+            })
         
-        # Check if migration is needed
-        with app.app_context():
-            inspector = db.inspect(db.engine)
-            columns = inspector.get_columns('users')
-            column_names = [col['name'] for col in columns]
-            
-            if 'reset_token' in column_names and 'reset_token_expires' in column_names:
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Password reset token columns already exist. Migration not needed.',
-                    'columns_exist': True
-                })
-            
-            # Perform migration
-            results = []
-            
-            # Add the new columns for PostgreSQL
+        # SQLite has no ADD COLUMN IF NOT EXISTS - check the existing columns first
+        inspector = db.inspect(db.engine)
+        column_names = {col['name'] for col in inspector.get_columns('users')}
+        
+        if 'reset_token' in column_names and 'reset_token_expires' in column_names:
+            return jsonify({
+                'status': 'success',
+                'message': 'Password reset token columns already exist. Migration not needed.',
+                'columns_exist': True
+            })
+        
+        results = []
+        with db.engine.begin() as connection:
             if 'reset_token' not in column_names:
-                with db.engine.connect() as connection:
-                    connection.execute(db.text('ALTER TABLE users ADD COLUMN reset_token VARCHAR(100)'))
-                    connection.commit()
+                connection.execute(db.text('ALTER TABLE users ADD COLUMN reset_token VARCHAR(100)'))
                 results.append('Added reset_token column')
-            
             if 'reset_token_expires' not in column_names:
-                with db.engine.connect() as connection:
-                    # Use TIMESTAMP for PostgreSQL
-                    connection.execute(db.text('ALTER TABLE users ADD COLUMN reset_token_expires TIMESTAMP'))
-                    connection.commit()
+                connection.execute(db.text('ALTER TABLE users ADD COLUMN reset_token_expires TIMESTAMP'))
                 results.append('Added reset_token_expires column')
-            
-            # Verify migration
-            inspector = db.inspect(db.engine)
-            columns = inspector.get_columns('users')
-            column_names = [col['name'] for col in columns]
-            
-            required_columns = ['reset_token', 'reset_token_expires']
-            missing_columns = [col for col in required_columns if col not in column_names]
-            
-            if missing_columns:
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Migration verification failed. Missing columns: {missing_columns}',
-                    'results': results
-                }), 500
-            
-            return jsonify({
-                'status': 'success',
-                'message': 'Password reset token migration completed successfully!',
-                'results': results,
-                'columns_added': len(results)
-            })
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Password reset token migration completed successfully!',
+            'results': results,
+            'columns_added': len(results)
+        })
             
     except Exception as e:
         return jsonify({
@@ -1633,36 +1686,47 @@ def migrate_reset_tokens():
             'error_type': type(e).__name__
         }), 500
 
+def _add_quizzes_column(column_name, column_ddl):
+    """Add a column to quizzes if it's missing; returns True if this call added it.
+    
+    One single-row catalog probe (information_schema on Postgres, pragma_table_info
+    on SQLite), then the ALTER only when the column is absent. Postgres keeps
+    IF NOT EXISTS so a concurrent run can't fail on the ALTER.
+    """
+    with db.engine.begin() as connection:
+        if IS_POSTGRES:
+            exists = connection.execute(db.text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'quizzes' AND column_name = :name"
+            ), {'name': column_name}).first()
+            if exists:
+                return False
+            connection.execute(db.text(f'ALTER TABLE quizzes ADD COLUMN IF NOT EXISTS {column_name} {column_ddl}'))
+            return True
+        exists = connection.execute(db.text(
+            "SELECT 1 FROM pragma_table_info('quizzes') WHERE name = :name"
+        ), {'name': column_name}).first()
+        if exists:
+            return False
+        connection.execute(db.text(f'ALTER TABLE quizzes ADD COLUMN {column_name} {column_ddl}'))
+        return True
+
 @app.route('/admin/migrate/quiz-feedback')
 def migrate_quiz_feedback():
     """Run quiz feedback column migration in production"""
     try:
-        # Perform migration directly
-        with db.engine.connect() as connection:
-            # Check if column exists first
-            result = connection.execute(db.text("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'quizzes' 
-                AND column_name = 'collect_feedback'
-            """))
-            
-            if result.fetchone():
-                return jsonify({
-                    'status': 'success',
-                    'message': 'collect_feedback column already exists. Migration not needed.',
-                    'column_exists': True
-                })
-            
-            # Add the column
-            connection.execute(db.text('ALTER TABLE quizzes ADD COLUMN collect_feedback BOOLEAN DEFAULT FALSE'))
-            connection.commit()
-            
+        if not _add_quizzes_column('collect_feedback', 'BOOLEAN DEFAULT FALSE'):
             return jsonify({
                 'status': 'success',
-                'message': 'Quiz feedback column migration completed successfully!',
-                'column_added': True
+                'message': 'collect_feedback column already exists. Migration not needed.',
+                'column_exists': True
             })
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Quiz feedback column migration completed successfully!',
+            'column_added': True
+        })
             
     except Exception as e:
         return jsonify({
@@ -1676,31 +1740,18 @@ def migrate_quiz_feedback():
 def migrate_external_participants():
     """Database migration to add allow_external_participants column to quizzes table"""
     try:
-        with db.engine.connect() as connection:
-            # Check if column already exists (PostgreSQL syntax)
-            result = connection.execute(db.text("""
-                SELECT COUNT(*) 
-                FROM information_schema.columns 
-                WHERE table_name = 'quizzes' 
-                    AND column_name = 'allow_external_participants'
-            """))
-            
-            if result.fetchone()[0] > 0:
-                return jsonify({
-                    'status': 'success',
-                    'message': 'allow_external_participants column already exists. Migration not needed.',
-                    'column_exists': True
-                })
-            
-            # Add the column
-            connection.execute(db.text('ALTER TABLE quizzes ADD COLUMN allow_external_participants BOOLEAN DEFAULT FALSE'))
-            connection.commit()
-            
+        if not _add_quizzes_column('allow_external_participants', 'BOOLEAN DEFAULT FALSE'):
             return jsonify({
                 'status': 'success',
-                'message': 'External participants column migration completed successfully!',
-                'column_added': True
+                'message': 'allow_external_participants column already exists. Migration not needed.',
+                'column_exists': True
             })
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'External participants column migration completed successfully!',
+            'column_added': True
+        })
             
     except Exception as e:
         return jsonify({
@@ -2044,8 +2095,7 @@ def admin_dashboard():
 @require_admin
 def analytics_dashboard():
     """Comprehensive analytics dashboard with participant behavior insights."""
-    from sqlalchemy import func, case, distinct, extract
-    from collections import Counter, defaultdict
+    from sqlalchemy import func, case
     
     # ── 1. Overview KPIs ──
     total_events = Event.query.count()
@@ -2385,8 +2435,6 @@ def reject_action(action_id):
 
 def execute_approved_action(action):
     """Execute an approved action"""
-    import json
-    
     action_data = json.loads(action.action_data)
     action_type = action.action_type
     
@@ -2678,6 +2726,11 @@ def event_dashboard(event_id):
     participants = pagination.items
 
     # ── Single aggregate query for ALL stats (replaces 9+ separate COUNT queries) ──
+    # Certificate count (separate table) rides along as a scalar subquery
+    certificates_issued = db.select(
+        db.func.count(db.distinct(Certificate.participant_id))
+    ).where(Certificate.event_id == event_id).scalar_subquery()
+
     P = Participant
     agg = db.session.query(
         db.func.count(P.id).label('total'),
@@ -2689,13 +2742,9 @@ def event_dashboard(event_id):
         db.func.count(db.case((P.email_delivery_status == 'clicked', 1))).label('clicked'),
         db.func.count(db.case((P.email_delivery_status.in_(['soft_bounce', 'hard_bounce']), 1))).label('bounced'),
         db.func.count(db.case((P.email_delivery_status == 'spam', 1))).label('spam'),
+        certificates_issued.label('certificates_issued'),
     ).filter(P.event_id == event_id).one()
 
-    # Certificate count (separate table, still just 1 query)
-    certificates_issued = db.session.query(
-        db.func.count(db.distinct(Certificate.participant_id))
-    ).filter(Certificate.event_id == event_id).scalar() or 0
-
     total_count = agg.total
     brevo_stats = {}
     if IS_BREVO_SMTP:
@@ -2713,7 +2762,7 @@ def event_dashboard(event_id):
         'pending': total_count - agg.checked_in,
         'emails_sent': agg.emails_sent,
         'emails_unsent': total_count - agg.emails_sent,
-        'certificates_issued': certificates_issued,
+        'certificates_issued': agg.certificates_issued or 0,
         'filtered_total': pagination.total,  # total matching current filter
         'page': page,
         'per_page': per_page,
@@ -3242,13 +3291,13 @@ def migrate_email_tracking():
     skipped = []
     try:
         with db.engine.connect() as conn:
+            # Existing columns, read once (works for both Postgres and SQLite)
+            result = conn.execute(db.text(
+                "SELECT * FROM participants LIMIT 0"
+            ))
+            existing_cols = {c.lower() for c in result.keys()}
             for col_name, col_type in columns_to_add:
                 try:
-                    # Check if column exists (works for both Postgres and SQLite)
-                    result = conn.execute(db.text(
-                        "SELECT * FROM participants LIMIT 0"
-                    ))
-                    existing_cols = [c.lower() for c in result.keys()]
                     if col_name.lower() in existing_cols:
                         skipped.append(col_name)
                         continue
@@ -3284,7 +3333,7 @@ def migrate_email_tracking():
 @app.route('/admin/migrate/indexes')
 @require_superadmin
 def migrate_indexes():
-    """Create performance indexes on participants table.
+    """Create performance indexes on participants, certificates and quiz tables.
     Safe to run multiple times — uses IF NOT EXISTS.
     """
     indexes = [
@@ -3296,15 +3345,26 @@ def migrate_indexes():
         ('ix_participants_name_trgm',              'participants', 'name'),
         ('ix_participants_email_trgm',             'participants', 'email'),
         ('ix_certificates_event_participant',      'certificates', 'event_id, participant_id'),
+        ('ix_participants_email_event',            'participants', 'email, event_id'),
+        ('ix_quiz_questions_quiz_order',           'quiz_questions', 'quiz_id, question_order'),
+        ('ix_quiz_attempts_quiz_completed',        'quiz_attempts', 'quiz_id, is_completed'),
+    ]
+    # Unique indexes back the ON CONFLICT paths in the quiz handlers. They are created
+    # last: an existing duplicate row makes them fail and aborts the transaction on Postgres
+    unique_indexes = [
+        ('ix_quiz_attempts_quiz_participant',      'quiz_attempts', 'quiz_id, participant_id'),
+        ('ix_quiz_answers_attempt_question',       'quiz_answers',  'attempt_id, question_id'),
     ]
+    statements = [('CREATE INDEX', idx) for idx in indexes] + \
+                 [('CREATE UNIQUE INDEX', idx) for idx in unique_indexes]
     created = []
     skipped = []
     try:
         with db.engine.connect() as conn:
-            for idx_name, table, columns in indexes:
+            for create, (idx_name, table, columns) in statements:
                 try:
                     conn.execute(db.text(
-                        f'CREATE INDEX IF NOT EXISTS {idx_name} ON {table} ({columns})'
+                        f'{create} IF NOT EXISTS {idx_name} ON {table} ({columns})'
                     ))
                     created.append(idx_name)
                 except Exception as e:
@@ -3337,17 +3397,23 @@ def event_stats_api(event_id):
     """API endpoint for real-time event check-in stats"""
     try:
         event = Event.query.get_or_404(event_id)
-        base_q = Participant.query.filter_by(event_id=event_id)
-        total = base_q.count()
-        checked_in = base_q.filter(Participant.checked_in == True).count()
+        P = Participant
+        total, checked_in = db.session.query(
+            db.func.count(P.id),
+            db.func.count(db.case((P.checked_in == True, 1)))
+        ).filter(P.event_id == event_id).one()
         pending = total - checked_in
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'total': total,
             'checked_in': checked_in,
             'pending': pending
         })
+        # The check-in page polls this endpoint; unchanged counts revalidate to an empty 304
+        response.set_etag(f"{event_id}-{total}-{checked_in}")
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -3483,9 +3549,15 @@ def send_emails(event_id):
             flash('Email not configured. Please set up email settings in environment variables.', 'error')
             return redirect(url_for('event_dashboard', event_id=event_id))
 
+        target = f"{len(selected_ids)} selected" if selected_ids else "all"
+        if _email_executor:
+            _email_executor.submit(_send_ticket_emails_job, event_id, [p.id for p in participants])
+            flash(f'Sending emails to {len(participants)} of {target} participants in the background. '
+                  f'Refresh the dashboard to follow progress.', 'info')
+            return redirect(url_for('event_dashboard', event_id=event_id))
+
         sent_count, error_count, _ = send_emails_batch(participants, event)
 
-        target = f"{len(selected_ids)} selected" if selected_ids else "all"
         if sent_count > 0:
             flash(f'Emails sent successfully to {sent_count} of {target} participants!', 'success')
         if error_count > 0:
@@ -3702,24 +3774,35 @@ def list_event_participants_debug(event_id):
 @require_admin
 def export_attendance(event_id):
     event = Event.query.get_or_404(event_id)
-    participants = Participant.query.filter_by(event_id=event_id).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Name', 'Email', 'Ticket Number', 'Checked In', 'Check-in Time'])
     
-    for p in participants:
-        writer.writerow([
-            p.name,
-            p.email,
-            p.ticket_number,
-            'Yes' if p.checked_in else 'No',
-            p.checkin_time.strftime('%Y-%m-%d %H:%M:%S') if p.checkin_time else ''
-        ])
+    # Only the exported columns, fetched in chunks (server-side cursor where the driver supports it)
+    rows = db.session.query(
+        Participant.name, Participant.email, Participant.ticket_number,
+        Participant.checked_in, Participant.checkin_time
+    ).filter(Participant.event_id == event_id).order_by(Participant.id).yield_per(500)
+    
+    def generate():
+        # Stream the CSV line by line so memory stays flat and the download starts immediately
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['Name', 'Email', 'Ticket Number', 'Checked In', 'Check-in Time'])
+        
+        for name, email, ticket_number, checked_in, checkin_time in rows:
+            writer.writerow([
+                name,
+                email,
+                ticket_number,
+                'Yes' if checked_in else 'No',
+                checkin_time.strftime('%Y-%m-%d %H:%M:%S') if checkin_time else ''
+            ])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+        
+        yield output.getvalue()
     
-    output.seek(0)
     return Response(
-        output.getvalue(),
+        stream_with_context(generate()),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment;filename=attendance_{event.id}.csv'}
     )
@@ -4055,16 +4138,22 @@ def send_reminder(event_id):
     sent_count = 0
     error_count = 0
     
-    for participant in participants:
-        try:
-            success = send_reminder_email(participant, event, is_tomorrow)
-            if success:
-                sent_count += 1
-            else:
-                error_count += 1
-        except Exception as e:
-            error_count += 1
-            print(f"❌ Reminder error for {participant.email}: {e}")
+    # One SMTP session (connect + TLS + login) for the whole batch instead of one per email
+    try:
+        with mail.connect() as conn:
+            for participant in participants:
+                try:
+                    success = send_reminder_email(participant, event, is_tomorrow, connection=conn)
+                    if success:
+                        sent_count += 1
+                    else:
+                        error_count += 1
+                except Exception as e:
+                    error_count += 1
+                    print(f"❌ Reminder error for {participant.email}: {e}")
+    except Exception as e:
+        flash(f'Email connection failed: {str(e)}', 'error')
+        return redirect(url_for('event_dashboard', event_id=event_id))
     
     target = f"{len(selected_ids)} selected" if selected_ids else "all"
     if sent_count > 0:
@@ -4335,10 +4424,10 @@ def speaker_remove_event(speaker_id, event_id):
 @require_admin
 def certificate_preview_page(event_id):
     """Certificate preview and configuration page"""
-    event = Event.query.get_or_404(event_id)
-    
-    # Get or create certificate configuration
-    cert_config = CertificateConfig.query.filter_by(event_id=event_id).first()
+    # Event and its certificate configuration (if any) in one round trip
+    event, cert_config = db.session.query(Event, CertificateConfig).outerjoin(
+        CertificateConfig, CertificateConfig.event_id == Event.id
+    ).filter(Event.id == event_id).first_or_404()
     
     # Initialize form with existing data
     form = CertificateConfigForm()
@@ -4445,7 +4534,6 @@ def save_certificate_config(event_id):
             
             db.session.commit()
             
-            flash('Certificate configuration saved successfully!', 'success')
             return jsonify({'status': 'success', 'message': 'Configuration saved successfully!'})
             
         except Exception as e:
@@ -4692,8 +4780,10 @@ def preview_single_certificate(participant_id):
 @app.route('/event/<int:event_id>/certificates/generate', methods=['POST'])
 def generate_certificates(event_id):
     """Generate and send certificates to eligible participants"""
-    event = Event.query.get_or_404(event_id)
-    cert_config = CertificateConfig.query.filter_by(event_id=event_id).first()
+    # Event and its certificate configuration (if any) in one round trip
+    event, cert_config = db.session.query(Event, CertificateConfig).outerjoin(
+        CertificateConfig, CertificateConfig.event_id == Event.id
+    ).filter(Event.id == event_id).first_or_404()
     
     if not cert_config:
         flash('Please configure the certificate first.', 'error')
@@ -4712,6 +4802,11 @@ def generate_certificates(event_id):
         success_count = 0
         error_count = 0
         
+        # Every certificate in the batch shares the issue date, so the email body
+        # only differs per recipient in a few fields - render it once up front
+        issued_date = datetime.now(timezone.utc)
+        email_base_html = render_certificate_email_base(event, cert_config, issued_date)
+        
         for participant in eligible_participants:
             try:
                 # Generate certificate
@@ -4735,14 +4830,14 @@ def generate_certificates(event_id):
                     signature2_name=cert_config.signature2_name,
                     signature2_title=cert_config.signature2_title,
                     signature2_image_url=cert_config.signature2_image_url,
-                    issued_date=datetime.now(timezone.utc)
+                    issued_date=issued_date
                 )
                 
                 db.session.add(certificate)
                 db.session.commit()
                 
                 # Send certificate email (with PDF attachment - to be implemented)
-                if send_certificate_email(participant, event, certificate):
+                if send_certificate_email(participant, event, certificate, base_html=email_base_html):
                     success_count += 1
                     print(f"? Certificate generated and sent to {participant.name}")
                 else:
@@ -4765,8 +4860,30 @@ def generate_certificates(event_id):
     
     return redirect(url_for('certificate_preview_page', event_id=event_id))
 
-def send_certificate_email(participant, event, certificate):
-    """Send certificate email with PDF attachment"""
+def render_certificate_email_base(event, cert_config, issued_date):
+    """Render the certificate email once, with placeholders for the per-recipient fields"""
+    from types import SimpleNamespace
+    
+    participant = SimpleNamespace(name='[[participant_name]]')
+    certificate = SimpleNamespace(
+        certificate_type=cert_config.certificate_type,
+        event_location=cert_config.event_location,
+        organizer_name=cert_config.organizer_name,
+        certificate_number='[[certificate_number]]',
+        issued_date=issued_date
+    )
+    return render_template('email/certificate_email.html',
+                           event=event,
+                           participant=participant,
+                           certificate=certificate,
+                           attachment_filename='[[attachment_filename]]')
+
+def send_certificate_email(participant, event, certificate, base_html=None):
+    """Send certificate email with PDF attachment
+    
+    base_html: optional output of render_certificate_email_base() for batch sends,
+    which skips the Jinja render for each recipient.
+    """
     try:
         print(f"🚀 Preparing certificate email for {participant.email}")
         
@@ -4781,12 +4898,20 @@ def send_certificate_email(participant, event, certificate):
         
         # Create certificate email
         subject = f"Your Certificate - {event.name}"
-        
-        # Render email template
-        email_html = render_template('email/certificate_email.html',
-                                   event=event,
-                                   participant=participant,
-                                   certificate=certificate)
+        filename = f"Certificate_{participant.name.replace(' ', '_')}_{event.name.replace(' ', '_')}.pdf"
+        
+        # Render email template (or fill in the batch-rendered one)
+        if base_html:
+            email_html = (base_html
+                          .replace('[[certificate_number]]', str(escape(certificate.certificate_number)))
+                          .replace('[[attachment_filename]]', str(escape(filename)))
+                          .replace('[[participant_name]]', str(escape(participant.name))))
+        else:
+            email_html = render_template('email/certificate_email.html',
+                                       event=event,
+                                       participant=participant,
+                                       certificate=certificate,
+                                       attachment_filename=filename)
         
         # Create email message with explicit sender
         msg = Message(
@@ -4800,7 +4925,6 @@ def send_certificate_email(participant, event, certificate):
         try:
             pdf_data = generate_certificate_pdf(participant, event, certificate)
             if pdf_data:
-                filename = f"Certificate_{participant.name.replace(' ', '_')}_{event.name.replace(' ', '_')}.pdf"
                 msg.attach(filename, "application/pdf", pdf_data)
                 print(f"📎 PDF certificate attached: {filename}")
             else:
@@ -4829,6 +4953,18 @@ def send_certificate_email(participant, event, certificate):
 
 def generate_certificate_pdf(participant, event, certificate):
     """Generate PDF certificate using multiple fallback methods"""
+    # The HTML fallbacks share one render; ReportLab (the common path) never needs it
+    cached_html = None
+
+    def certificate_html():
+        nonlocal cached_html
+        if cached_html is None:
+            cached_html = render_template('certificate_professional.html',
+                                          event=event,
+                                          participant=participant,
+                                          certificate=certificate)
+        return cached_html
+
     try:
         # Method 1: Try ReportLab (most reliable for serverless)
         try:
@@ -4843,13 +4979,8 @@ def generate_certificate_pdf(participant, event, certificate):
         
         # Method 2: Try rendering HTML and convert with WeasyPrint
         try:
-            certificate_html = render_template('certificate_professional.html',
-                                             event=event,
-                                             participant=participant,
-                                             certificate=certificate)
-            
             import weasyprint
-            pdf = weasyprint.HTML(string=certificate_html).write_pdf()
+            pdf = weasyprint.HTML(string=certificate_html()).write_pdf()
             print(f"✅ PDF generated using WeasyPrint for {participant.name}")
             return pdf
         except ImportError:
@@ -4859,11 +4990,6 @@ def generate_certificate_pdf(participant, event, certificate):
             
         # Method 3: Try pdfkit (requires wkhtmltopdf binary)
         try:
-            certificate_html = render_template('certificate_professional.html',
-                                             event=event,
-                                             participant=participant,
-                                             certificate=certificate)
-            
             options = {
                 'page-size': 'A4',
                 'orientation': 'Landscape',
@@ -4878,7 +5004,7 @@ def generate_certificate_pdf(participant, event, certificate):
                 'disable-smart-shrinking': None,
             }
             
-            pdf_data = pdfkit.from_string(certificate_html, False, options=options)
+            pdf_data = pdfkit.from_string(certificate_html(), False, options=options)
             print(f"✅ PDF generated using pdfkit for {participant.name}")
             return pdf_data
         except Exception as pdfkit_error:
@@ -4892,18 +5018,64 @@ def generate_certificate_pdf(participant, event, certificate):
         print(f"❌ Error generating PDF certificate: {str(e)}")
         return None
 
+# Remote certificate images that just failed are skipped for a short while, so a flaky
+# CDN costs one timeout per URL per batch instead of one per participant - and a
+# recovered URL is picked up again once the entry expires
+_dead_urls = {}  # url -> time.monotonic() until which it is skipped
+_DEAD_URL_TTL = 60
+_FETCH_TIMEOUT = 2.0
+
+def _fetch(url):
+    """Fetch a remote image, returning its bytes or None if the URL is (currently) dead"""
+    import requests
+
+    if _dead_urls.get(url, 0) > time.monotonic():
+        return None
+    try:
+        response = requests.get(url, timeout=_FETCH_TIMEOUT)
+    except (requests.Timeout, requests.ConnectionError) as e:
+        print(f"⚠️ Image fetch failed, skipping for {_DEAD_URL_TTL}s: {url} ({e})")
+        _dead_urls[url] = time.monotonic() + _DEAD_URL_TTL
+        return None
+    if response.status_code != 200:
+        print(f"⚠️ Image fetch returned {response.status_code}, skipping for {_DEAD_URL_TTL}s: {url}")
+        _dead_urls[url] = time.monotonic() + _DEAD_URL_TTL
+        return None
+    _dead_urls.pop(url, None)
+    return response.content
+
+# Successfully loaded certificate images, memoized per process. Failures (None) are
+# not cached, so a file uploaded later or a recovered CDN is used on the next attempt
+_certificate_images = {}
+_CERTIFICATE_IMAGE_CACHE_SIZE = 64
+
+def _load_certificate_image(src):
+    """Resolve a logo/signature URL or upload path to an ImageReader (None if unavailable)"""
+    from reportlab.lib.utils import ImageReader
+
+    image = _certificate_images.get(src)
+    if image is not None:
+        return image
+
+    if src.startswith('http'):
+        content = _fetch(src)
+        image = ImageReader(io.BytesIO(content)) if content else None
+    else:
+        # Local file - convert relative path to absolute
+        path = os.path.join(os.getcwd(), src[1:]) if src.startswith('/uploads/') else src
+        image = ImageReader(path) if os.path.exists(path) else None
+
+    if image is not None:
+        if len(_certificate_images) >= _CERTIFICATE_IMAGE_CACHE_SIZE:
+            _certificate_images.pop(next(iter(_certificate_images)), None)  # evict the oldest
+        _certificate_images[src] = image
+    return image
+
 def generate_certificate_with_reportlab(participant, event, certificate):
     """Generate certificate PDF using proven ReportLab canvas approach"""
     try:
-        from flask import render_template
         from reportlab.lib.pagesizes import A4, landscape
         from reportlab.pdfgen import canvas
-        from reportlab.lib.colors import HexColor
-        from reportlab.lib.utils import ImageReader
-        import io
-        import requests
-        from PIL import Image
-        import os
         
         print(f"🎨 Creating certificate PDF for {participant.name} using proven method")
         
@@ -4920,7 +5092,7 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         
         # Add certificate content using ReportLab
         # Background and border
-        pdf_canvas.setStrokeColor(HexColor('#0078d4'))
+        pdf_canvas.setStrokeColor(CERT_BLUE)
         pdf_canvas.setLineWidth(3)
         pdf_canvas.rect(20, 20, width-40, height-40)
         
@@ -4930,72 +5102,48 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         logo_height = 120  # Much larger - increased from 90
         try:
             if certificate.organizer_logo_url:
-                # Try to fetch and add organizer logo (LEFT side)
-                if certificate.organizer_logo_url.startswith('http'):
-                    response = requests.get(certificate.organizer_logo_url, timeout=5)
-                    if response.status_code == 200:
-                        logo_img = ImageReader(io.BytesIO(response.content))
-                        pdf_canvas.drawImage(logo_img, 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
-                else:
-                    # Local file - convert relative path to absolute
-                    if certificate.organizer_logo_url.startswith('/uploads/'):
-                        logo_path = os.path.join(os.getcwd(), certificate.organizer_logo_url[1:])
-                    else:
-                        logo_path = certificate.organizer_logo_url
-                    
-                    if os.path.exists(logo_path):
-                        logo_img = ImageReader(logo_path)
-                        pdf_canvas.drawImage(logo_img, 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
+                # Organizer logo (LEFT side)
+                logo_img = _load_certificate_image(certificate.organizer_logo_url)
+                if logo_img:
+                    pdf_canvas.drawImage(logo_img, 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
             
             if certificate.sponsor_logo_url:
-                # Try to fetch and add sponsor logo (RIGHT side)
-                if certificate.sponsor_logo_url.startswith('http'):
-                    response = requests.get(certificate.sponsor_logo_url, timeout=5)
-                    if response.status_code == 200:
-                        logo_img = ImageReader(io.BytesIO(response.content))
-                        pdf_canvas.drawImage(logo_img, width - logo_width - 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
-                else:
-                    # Local file - convert relative path to absolute
-                    if certificate.sponsor_logo_url.startswith('/uploads/'):
-                        logo_path = os.path.join(os.getcwd(), certificate.sponsor_logo_url[1:])
-                    else:
-                        logo_path = certificate.sponsor_logo_url
-                    
-                    if os.path.exists(logo_path):
-                        logo_img = ImageReader(logo_path)
-                        pdf_canvas.drawImage(logo_img, width - logo_width - 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
+                # Sponsor logo (RIGHT side)
+                logo_img = _load_certificate_image(certificate.sponsor_logo_url)
+                if logo_img:
+                    pdf_canvas.drawImage(logo_img, width - logo_width - 40, logo_y, width=logo_width, height=logo_height, mask='auto', preserveAspectRatio=True)
         except Exception as logo_error:
             print(f"Could not add logos to PDF: {logo_error}")
         
         # Title
         pdf_canvas.setFont("Helvetica-Bold", 36)
-        pdf_canvas.setFillColor(HexColor('#0078d4'))
+        pdf_canvas.setFillColor(CERT_BLUE)
         draw_centered_text(pdf_canvas, width/2, height-180, "CERTIFICATE")
         
         # Subtitle
         pdf_canvas.setFont("Helvetica", 18)
-        pdf_canvas.setFillColor(HexColor('#323130'))
+        pdf_canvas.setFillColor(CERT_DARK)
         draw_centered_text(pdf_canvas, width/2, height-210, f"OF {certificate.certificate_type.upper()}")
         
         # "This is to certify that" text
         pdf_canvas.setFont("Helvetica", 14)
-        pdf_canvas.setFillColor(HexColor('#605e5c'))
+        pdf_canvas.setFillColor(CERT_GREY)
         draw_centered_text(pdf_canvas, width/2, height-260, "This is to certify that")
         
         # Participant name
         pdf_canvas.setFont("Helvetica-Bold", 28)
-        pdf_canvas.setFillColor(HexColor('#323130'))
+        pdf_canvas.setFillColor(CERT_DARK)
         draw_centered_text(pdf_canvas, width/2, height-300, participant.name)
         
         # Underline for participant name
-        pdf_canvas.setStrokeColor(HexColor('#0078d4'))
+        pdf_canvas.setStrokeColor(CERT_BLUE)
         pdf_canvas.setLineWidth(2)
         name_width = pdf_canvas.stringWidth(participant.name, "Helvetica-Bold", 28)
         pdf_canvas.line(width/2 - name_width/2, height-310, width/2 + name_width/2, height-310)
         
         # Event details
         pdf_canvas.setFont("Helvetica", 14)
-        pdf_canvas.setFillColor(HexColor('#323130'))
+        pdf_canvas.setFillColor(CERT_DARK)
         
         # Description text
         action = "participated in"
@@ -5009,12 +5157,12 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         
         # Event name
         pdf_canvas.setFont("Helvetica-Bold", 16)
-        pdf_canvas.setFillColor(HexColor('#0078d4'))
+        pdf_canvas.setFillColor(CERT_BLUE)
         draw_centered_text(pdf_canvas, width/2, height-380, f'"{event.name}"')
         
         # Organizer and date info
         pdf_canvas.setFont("Helvetica", 12)
-        pdf_canvas.setFillColor(HexColor('#323130'))
+        pdf_canvas.setFillColor(CERT_DARK)
         
         organizer = certificate.organizer_name or 'Azure Developer Community Tamilnadu'
         draw_centered_text(pdf_canvas, width/2, height-410, f"organized by {organizer}")
@@ -5029,7 +5177,7 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         signature_y = 120  # Moved down from 200
         
         # Signature lines
-        pdf_canvas.setStrokeColor(HexColor('#323130'))
+        pdf_canvas.setStrokeColor(CERT_DARK)
         pdf_canvas.setLineWidth(1)
         pdf_canvas.line(150, signature_y, 300, signature_y)  # Left signature line
         pdf_canvas.line(width-300, signature_y, width-150, signature_y)  # Right signature line
@@ -5037,38 +5185,16 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         # Try to add signature images
         try:
             if certificate.signature1_image_url:
-                if certificate.signature1_image_url.startswith('http'):
-                    response = requests.get(certificate.signature1_image_url, timeout=5)
-                    if response.status_code == 200:
-                        sig_img = ImageReader(io.BytesIO(response.content))
-                        pdf_canvas.drawImage(sig_img, 175, signature_y + 10, width=120, height=50, mask='auto')
-                else:
-                    # Local file - convert relative path to absolute
-                    if certificate.signature1_image_url.startswith('/uploads/'):
-                        sig_path = os.path.join(os.getcwd(), certificate.signature1_image_url[1:])
-                    else:
-                        sig_path = certificate.signature1_image_url
-                    
-                    if os.path.exists(sig_path):
-                        sig_img = ImageReader(sig_path)
-                        pdf_canvas.drawImage(sig_img, 175, signature_y + 10, width=120, height=50, mask='auto')
+                # Left signature
+                sig_img = _load_certificate_image(certificate.signature1_image_url)
+                if sig_img:
+                    pdf_canvas.drawImage(sig_img, 175, signature_y + 10, width=120, height=50, mask='auto')
             
             if certificate.signature2_image_url:
-                if certificate.signature2_image_url.startswith('http'):
-                    response = requests.get(certificate.signature2_image_url, timeout=5)
-                    if response.status_code == 200:
-                        sig_img = ImageReader(io.BytesIO(response.content))
-                        pdf_canvas.drawImage(sig_img, width-295, signature_y + 10, width=120, height=50, mask='auto')
-                else:
-                    # Local file - convert relative path to absolute
-                    if certificate.signature2_image_url.startswith('/uploads/'):
-                        sig_path = os.path.join(os.getcwd(), certificate.signature2_image_url[1:])
-                    else:
-                        sig_path = certificate.signature2_image_url
-                    
-                    if os.path.exists(sig_path):
-                        sig_img = ImageReader(sig_path)
-                        pdf_canvas.drawImage(sig_img, width-295, signature_y + 10, width=120, height=50, mask='auto')
+                # Right signature
+                sig_img = _load_certificate_image(certificate.signature2_image_url)
+                if sig_img:
+                    pdf_canvas.drawImage(sig_img, width-295, signature_y + 10, width=120, height=50, mask='auto')
         except Exception as sig_error:
             print(f"Could not add signatures to PDF: {sig_error}")
         
@@ -5077,7 +5203,7 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         signature2_name = certificate.signature2_name or 'Event Organizer'
         
         pdf_canvas.setFont("Helvetica-Bold", 11)
-        pdf_canvas.setFillColor(HexColor('#323130'))
+        pdf_canvas.setFillColor(CERT_DARK)
         draw_centered_text(pdf_canvas, 225, signature_y - 20, signature1_name)
         draw_centered_text(pdf_canvas, width-225, signature_y - 20, signature2_name)
         
@@ -5086,18 +5212,18 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         signature2_title = certificate.signature2_title or 'Microsoft MVP'
         
         pdf_canvas.setFont("Helvetica", 9)
-        pdf_canvas.setFillColor(HexColor('#605e5c'))
+        pdf_canvas.setFillColor(CERT_GREY)
         draw_centered_text(pdf_canvas, 225, signature_y - 35, signature1_title)
         draw_centered_text(pdf_canvas, width-225, signature_y - 35, signature2_title)
         
         # Footer with certificate details (moved down)
         pdf_canvas.setFont("Helvetica-Bold", 10)
-        pdf_canvas.setFillColor(HexColor('#0078d4'))
+        pdf_canvas.setFillColor(CERT_BLUE)
         pdf_canvas.drawString(50, 50, f"Certificate No: {certificate.certificate_number}")
         pdf_canvas.drawString(width-250, 50, f"Issued: {certificate.issued_date.strftime('%B %d, %Y')}")
         
         # Corner accents
-        pdf_canvas.setStrokeColor(HexColor('#0078d4'))
+        pdf_canvas.setStrokeColor(CERT_BLUE)
         pdf_canvas.setLineWidth(4)
         # Top left
         pdf_canvas.line(35, height-35, 85, height-35)
@@ -5129,9 +5255,8 @@ def generate_certificate_with_reportlab(participant, event, certificate):
         traceback.print_exc()
         return None
 
-# Initialize database on startup (only for local development)
-# Vercel will have database already set up
-if not os.getenv('DATABASE_URL'):
+def init_database():
+    """Create any missing tables (existing data is preserved)"""
     with app.app_context():
         try:
             # Only create tables if they don't exist (preserve existing data)
@@ -5140,13 +5265,30 @@ if not os.getenv('DATABASE_URL'):
         except Exception as e:
             print(f"Warning: Could not create database tables: {e}")
 
+@app.cli.command('init-db')
+def init_db_command():
+    """One-shot schema setup: flask --app index init-db"""
+    init_database()
+
+# Local SQLite (no DATABASE_URL) creates its tables at import, whatever the server
+# (python index.py, flask run, gunicorn). Postgres deployments skip it unless
+# RUN_DB_INIT=1 is set for a one-off deploy hook.
+if not os.getenv('DATABASE_URL') or os.getenv('RUN_DB_INIT'):
+    init_database()
+
 # Quiz Routes
+def _get_event_and_quiz(event_id):
+    """Event and its quiz (None if not created yet) in one round trip; 404 if the event doesn't exist"""
+    return db.session.query(Event, Quiz).outerjoin(
+        Quiz, Quiz.event_id == Event.id
+    ).filter(Event.id == event_id).first_or_404()
+
 @app.route('/event/<int:event_id>/quiz')
 @require_admin
 def quiz_dashboard(event_id):
     """Quiz management dashboard"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    # Event and its quiz (if any) in one round trip
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         quiz = Quiz(event_id=event_id, title=f'{event.name} Quiz')
@@ -5156,12 +5298,19 @@ def quiz_dashboard(event_id):
     questions = QuizQuestion.query.filter_by(quiz_id=quiz.id).order_by(QuizQuestion.question_order).all()
     attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
     
-    # Get statistics
+    # Get statistics (single pass over the attempts the template already needs)
+    completed = 0
+    score_sum = 0
+    for attempt in attempts:
+        if attempt.is_completed:
+            completed += 1
+            score_sum += attempt.score or 0
+    
     stats = {
         'total_questions': len(questions),
         'total_attempts': len(attempts),
-        'completed_attempts': len([a for a in attempts if a.is_completed]),
-        'average_score': round(sum(a.score for a in attempts if a.is_completed) / max(len([a for a in attempts if a.is_completed]), 1), 2)
+        'completed_attempts': completed,
+        'average_score': round(score_sum / max(completed, 1), 2)
     }
     
     return render_template('quiz_dashboard.html', event=event, quiz=quiz, questions=questions, attempts=attempts, stats=stats)
@@ -5170,8 +5319,7 @@ def quiz_dashboard(event_id):
 @require_admin  
 def quiz_share(event_id):
     """Secure quiz sharing page with QR codes"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('No quiz found for this event.', 'error')
@@ -5190,8 +5338,7 @@ def quiz_share(event_id):
 @require_admin
 def quiz_config(event_id):
     """Configure quiz settings"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         quiz = Quiz(event_id=event_id)
@@ -5205,6 +5352,8 @@ def quiz_config(event_id):
             form.populate_obj(quiz)
             quiz.updated_at = datetime.now(timezone.utc)
             db.session.commit()
+            # is_active is a form field - drop the cached status the answer route reads
+            quiz_performance.invalidate_quiz_status(quiz.id)
             
             flash('Quiz configuration saved successfully!', 'success')
             return redirect(url_for('quiz_dashboard', event_id=event_id))
@@ -5219,8 +5368,7 @@ def quiz_config(event_id):
 @require_admin
 def add_quiz_question(event_id):
     """Add a new quiz question manually"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('Please configure the quiz first.', 'error')
@@ -5249,6 +5397,7 @@ def add_quiz_question(event_id):
             
             db.session.add(question)
             db.session.commit()
+            quiz_performance.invalidate_quiz_status(quiz.id)
             
             flash('Question added successfully!', 'success')
             return redirect(url_for('quiz_dashboard', event_id=event_id))
@@ -5263,8 +5412,7 @@ def add_quiz_question(event_id):
 @require_admin
 def upload_quiz_questions(event_id):
     """Upload quiz questions via CSV"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('Please configure the quiz first.', 'error')
@@ -5275,7 +5423,8 @@ def upload_quiz_questions(event_id):
     if form.validate_on_submit():
         try:
             csv_file = form.csv_file.data
-            stream = io.StringIO(csv_file.stream.read().decode("UTF8"), newline=None)
+            # Stream rows straight off the upload instead of buffering the whole file
+            stream = io.TextIOWrapper(csv_file.stream, encoding='utf-8-sig', newline='')
             csv_input = csv.reader(stream)
             
             # Skip header row
@@ -5323,6 +5472,7 @@ def upload_quiz_questions(event_id):
                 current_order += 1
             
             db.session.commit()
+            quiz_performance.invalidate_quiz_status(quiz.id)
             flash(f'Successfully uploaded {questions_added} questions!', 'success')
             return redirect(url_for('quiz_dashboard', event_id=event_id))
             
@@ -5343,8 +5493,10 @@ def delete_quiz_question(event_id, question_id):
         if question.quiz.event_id != event_id:
             return jsonify({'success': False, 'error': 'Question not found'}), 404
         
+        quiz_id = question.quiz_id
         db.session.delete(question)
         db.session.commit()
+        quiz_performance.invalidate_quiz_status(quiz_id)
         
         flash('Question deleted successfully!', 'success')
         return jsonify({'success': True})
@@ -5358,30 +5510,48 @@ def delete_quiz_question(event_id, question_id):
 def delete_quiz(event_id):
     """Delete the entire quiz and all related data"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
+        quiz_id = quiz.id
         quiz_title = quiz.title
         
-        # Delete in proper order to avoid foreign key constraints
-        # 1. Delete quiz answers first
-        attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-        for attempt in attempts:
-            QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
-            db.session.delete(attempt)
-        
-        # 2. Delete quiz questions
-        QuizQuestion.query.filter_by(quiz_id=quiz.id).delete()
-        
-        # 3. Delete the quiz itself
-        db.session.delete(quiz)
+        if IS_POSTGRES:
+            # Single round trip: writable CTEs remove answers, attempts and questions
+            # alongside the quiz row (FK checks run at end of statement)
+            db.session.execute(db.text("""
+                WITH d_ans AS (
+                    DELETE FROM quiz_answers
+                    WHERE attempt_id IN (SELECT id FROM quiz_attempts WHERE quiz_id = :qid)
+                ), d_att AS (
+                    DELETE FROM quiz_attempts WHERE quiz_id = :qid
+                ), d_q AS (
+                    DELETE FROM quiz_questions WHERE quiz_id = :qid
+                )
+                DELETE FROM quizzes WHERE id = :qid
+            """), {'qid': quiz_id})
+        else:
+            # Delete in proper order to avoid foreign key constraints
+            # (bulk statements - no attempts are loaded into Python)
+            attempt_ids = db.session.query(QuizAttempt.id).filter(QuizAttempt.quiz_id == quiz_id)
+            
+            # 1. Delete quiz answers and attempts
+            QuizAnswer.query.filter(QuizAnswer.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
+            QuizAttempt.query.filter_by(quiz_id=quiz_id).delete(synchronize_session=False)
+            
+            # 2. Delete quiz questions
+            QuizQuestion.query.filter_by(quiz_id=quiz_id).delete(synchronize_session=False)
+            
+            # 3. Delete the quiz itself
+            Quiz.query.filter_by(id=quiz_id).delete(synchronize_session=False)
         
         db.session.commit()
+        quiz_performance.invalidate_quiz_status(quiz_id)
+        quiz_performance.invalidate_leaderboard(quiz_id)
+        quiz_performance.reset_quiz_spots(quiz_id)
         
-        flash(f'Quiz "{quiz_title}" and all related data deleted successfully!', 'success')
         return jsonify({'success': True, 'message': f'Quiz "{quiz_title}" deleted successfully!'})
         
     except Exception as e:
@@ -5393,39 +5563,31 @@ def delete_quiz(event_id):
 def reset_quiz(event_id):
     """Comprehensive quiz reset - clears all participant data while preserving questions"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        # Count data before deletion for feedback
-        attempts = QuizAttempt.query.filter_by(quiz_id=quiz.id).all()
-        attempt_count = len(attempts)
-        
-        # Count answers to be deleted
-        total_answers = 0
-        for attempt in attempts:
-            answers = QuizAnswer.query.filter_by(attempt_id=attempt.id).all()
-            total_answers += len(answers)
-        
-        # Delete all quiz answers first (due to foreign key constraints)
-        for attempt in attempts:
-            QuizAnswer.query.filter_by(attempt_id=attempt.id).delete()
+        # Delete all quiz answers first (due to foreign key constraints);
+        # the bulk deletes return their row counts for the feedback message
+        attempt_ids = db.session.query(QuizAttempt.id).filter(QuizAttempt.quiz_id == quiz.id)
+        total_answers = QuizAnswer.query.filter(QuizAnswer.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
         
         # Delete all quiz attempts
-        QuizAttempt.query.filter_by(quiz_id=quiz.id).delete()
+        attempt_count = QuizAttempt.query.filter_by(quiz_id=quiz.id).delete(synchronize_session=False)
         
         # Comprehensive quiz state reset
         quiz.is_active = False
         quiz.quiz_start_time = None
         quiz.quiz_end_time = None  # Setting this to None makes is_ended return False
-        quiz.updated_at = datetime.now(timezone.utc)
+        quiz.updated_at = db.func.now()
         
         # Commit all changes
         db.session.commit()
+        quiz_performance.invalidate_quiz_status(quiz.id)
+        quiz_performance.invalidate_leaderboard(quiz.id)
+        quiz_performance.reset_quiz_spots(quiz.id)
         
-        flash(f'Quiz completely reset! Removed {attempt_count} attempts and {total_answers} answers.', 'success')
         return jsonify({
             'success': True, 
             'message': f'Quiz completely reset! Removed {attempt_count} participant attempts and {total_answers} answers. Quiz is ready for fresh sessions.',
@@ -5442,8 +5604,7 @@ def reset_quiz(event_id):
 def open_quiz_registration(event_id):
     """Open quiz for participant registration (Phase 1)"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
@@ -5456,6 +5617,8 @@ def open_quiz_registration(event_id):
         quiz.quiz_start_time = None  # Key: No start time = registration only
         quiz.quiz_end_time = None
         db.session.commit()
+        quiz_performance.reset_quiz_spots(quiz.id)
+        quiz_performance.cache_quiz_status(quiz.id, quiz.is_active, quiz.is_ended, quiz.total_questions)
         
         return jsonify({'success': True, 'message': 'Quiz registration opened! Participants can now join.'})
         
@@ -5468,8 +5631,7 @@ def open_quiz_registration(event_id):
 def start_quiz(event_id):
     """Start the quiz for all participants (Phase 2)"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
@@ -5484,9 +5646,10 @@ def start_quiz(event_id):
             return jsonify({'success': False, 'error': 'No questions added to quiz'}), 400
         
         # Start the actual quiz
-        quiz.quiz_start_time = datetime.now(timezone.utc)
+        quiz.quiz_start_time = db.func.now()
         # is_active remains True so people can still join if needed
         db.session.commit()
+        quiz_performance.cache_quiz_status(quiz.id, quiz.is_active, quiz.is_ended, quiz.total_questions)
         
         return jsonify({'success': True, 'message': f'Quiz started! {quiz.current_participants} participants can now take the quiz.'})
         
@@ -5499,15 +5662,15 @@ def start_quiz(event_id):
 def end_quiz(event_id):
     """End the quiz (admin function)"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        quiz.quiz_end_time = datetime.now(timezone.utc)
+        quiz.quiz_end_time = db.func.now()
         quiz.is_active = False
         db.session.commit()
+        quiz_performance.cache_quiz_status(quiz.id, quiz.is_active, quiz.is_ended, quiz.total_questions)
         
         return jsonify({'success': True, 'message': 'Quiz ended successfully!'})
         
@@ -5518,8 +5681,7 @@ def end_quiz(event_id):
 @app.route('/event/<int:event_id>/quiz/play')
 def play_quiz(event_id):
     """Main quiz interface for participants"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('Quiz not found.', 'error')
@@ -5546,24 +5708,7 @@ def join_quiz(event_id):
         if not participant_email:
             return jsonify({'success': False, 'error': 'Email is required'}), 400
         
-        event = Event.query.get_or_404(event_id)
-        
-        # Use cached quiz data if available
-        cached_quiz = quiz_performance.get_cached_quiz_data(event_id)
-        if cached_quiz and cached_quiz.get('is_active'):
-            quiz_id = cached_quiz['quiz_id']
-            quiz = Quiz.query.get(quiz_id)
-        else:
-            quiz = Quiz.query.filter_by(event_id=event_id).first()
-            if quiz:
-                # Cache quiz data for faster subsequent requests
-                quiz_cache_data = {
-                    'quiz_id': quiz.id,
-                    'is_active': quiz.is_active,
-                    'title': quiz.title,
-                    'total_questions': quiz.total_questions
-                }
-                quiz_performance.cache_quiz_data(event_id, quiz_cache_data)
+        event, quiz = _get_event_and_quiz(event_id)
         
         if not quiz:
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
@@ -5574,13 +5719,6 @@ def join_quiz(event_id):
         if quiz.is_ended:
             return jsonify({'success': False, 'error': 'Quiz has ended. Check the leaderboard for results.'}), 400
         
-        # Check participant limit before allowing new participants
-        if quiz.is_full:
-            return jsonify({
-                'success': False, 
-                'error': f'Quiz is full! Maximum {quiz.participant_limit} participants allowed.'
-            }), 400
-        
         # Record participation for stats
         quiz_stats.record_participation(quiz.id, 'join')
         
@@ -5594,14 +5732,11 @@ def join_quiz(event_id):
                     return jsonify({'success': False, 'error': 'Name is required for new participants'}), 400
                 
                 # Generate static data for external participants with EXT- prefix
-                import uuid
-                import time
-                
                 # Generate unique ticket number with EXT- prefix - ensure uniqueness
                 attempts = 0
                 while attempts < 5:  # Try up to 5 times to generate unique ticket
                     try:
-                        ext_ticket_number = f"EXT-{event_id}-{int(time.time())}-{uuid.uuid4().hex[:6].upper()}"
+                        ext_ticket_number = f"EXT-{event_id}-{int(time.time())}-{secrets.token_hex(3).upper()}"
                         
                         # Check if ticket number already exists
                         existing = Participant.query.filter_by(ticket_number=ext_ticket_number).first()
@@ -5635,11 +5770,12 @@ def join_quiz(event_id):
                     db.session.rollback()
                     return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
         else:
-            # Standard logic: Only event participants can join
+            # Standard logic: Only event participants can join (plain read - the
+            # attempt insert below is what has to be atomic, not the participant row)
             participant = Participant.query.filter_by(
                 email=participant_email, 
                 event_id=event_id
-            ).with_for_update().first()  # Lock for update to prevent race conditions
+            ).first()
             
             if not participant:
                 return jsonify({
@@ -5647,44 +5783,64 @@ def join_quiz(event_id):
                     'error': 'You must be registered for this event to participate in the quiz. Please contact the event organizer.'
                 }), 403
         
-        # Check for existing attempt with optimized query
-        existing_attempt = QuizAttempt.query.filter_by(
-            quiz_id=quiz.id,
-            participant_id=participant.id
+        # Create the attempt in one statement instead of SELECT-then-INSERT:
+        # ON CONFLICT DO NOTHING (unique quiz_id+participant_id index) makes concurrent
+        # joins atomic, NOT EXISTS covers databases still missing that index
+        insert = pg_insert if IS_POSTGRES else sqlite_insert
+        already_joined = db.exists().where(
+            QuizAttempt.quiz_id == quiz.id,
+            QuizAttempt.participant_id == participant.id
+        )
+        new_attempt = db.session.execute(
+            insert(QuizAttempt)
+            .from_select(
+                ['quiz_id', 'participant_id'],
+                db.select(db.literal(quiz.id), db.literal(participant.id)).where(~already_joined)
+            )
+            .on_conflict_do_nothing()
+            .returning(QuizAttempt.id, QuizAttempt.current_question)
         ).first()
         
-        if existing_attempt:
-            if existing_attempt.is_completed:
-                return jsonify({'success': False, 'error': 'You have already completed this quiz'}), 400
-            else:
-                # Resume existing attempt
-                attempt = existing_attempt
-        else:
-            # Double-check participant limit before creating new attempt (race condition protection)
-            current_attempt_count = QuizAttempt.query.filter_by(quiz_id=quiz.id).count()
-            if current_attempt_count >= quiz.participant_limit:
+        if new_attempt:
+            # Participant limit: atomic Redis counter instead of COUNT(*) on every join
+            # (only new attempts take a slot - resuming players are always let back in)
+            if not quiz_performance.claim_quiz_spot(
+                quiz.id, quiz.participant_limit,
+                lambda: QuizAttempt.query.filter_by(quiz_id=quiz.id).count()
+            ):
+                db.session.rollback()
                 return jsonify({
                     'success': False, 
                     'error': f'Quiz is full! Maximum {quiz.participant_limit} participants allowed.'
                 }), 400
+            attempt_id, current_question = new_attempt
+        else:
+            # Already joined - resume the existing attempt
+            existing_attempt = db.session.query(
+                QuizAttempt.id, QuizAttempt.current_question, QuizAttempt.is_completed
+            ).filter_by(quiz_id=quiz.id, participant_id=participant.id).first()
             
-            # Create new attempt
-            attempt = QuizAttempt(
-                quiz_id=quiz.id,
-                participant_id=participant.id
-            )
-            db.session.add(attempt)
+            if existing_attempt.is_completed:
+                db.session.rollback()
+                return jsonify({'success': False, 'error': 'You have already completed this quiz'}), 400
+            attempt_id, current_question = existing_attempt.id, existing_attempt.current_question
         
-        db.session.commit()
+        participant_id = participant.id
+        try:
+            db.session.commit()
+        except Exception:
+            if new_attempt:
+                quiz_performance.release_quiz_spot(quiz.id)
+            raise
         
         # Check if quiz has started for participants
         quiz_started = quiz.is_started
         
         return jsonify({
             'success': True,
-            'attempt_id': attempt.id,
-            'participant_id': participant.id,
-            'current_question': attempt.current_question,
+            'attempt_id': attempt_id,
+            'participant_id': participant_id,
+            'current_question': current_question,
             'quiz_started': quiz_started,
             'registration_phase': not quiz_started,
             'message': 'Joined quiz successfully! Waiting for gamemaster to start...' if not quiz_started else 'Quiz started! You can begin answering questions.'
@@ -5721,13 +5877,26 @@ def get_quiz_question(attempt_id):
             question_order=attempt.current_question
         ).first()
         
+        if not question and attempt.is_completed:
+            # Already finalized by submit_quiz_answer - nothing to write
+            return jsonify({
+                'success': True,
+                'completed': True,
+                'score': attempt.score,
+                'total_questions': quiz.total_questions,
+                'collect_feedback': quiz.collect_feedback  # Include feedback flag
+            })
+        
         if not question:
-            # No more questions, complete the attempt
-            import time
-            completion_time = datetime.now(timezone.utc)
-            attempt.is_completed = True
-            attempt.completed_at = completion_time
-            attempt.completion_timestamp = time.time()  # Unix timestamp with microseconds
+            # No more questions, complete the attempt. Compare-and-set on is_completed
+            # instead of a row lock: a repeated or concurrent request can't overwrite the
+            # first completion time that the leaderboard tie-break uses
+            QuizAttempt.query.filter_by(id=attempt.id, is_completed=False).update({
+                QuizAttempt.is_completed: True,
+                # Python clock: SQLite's CURRENT_TIMESTAMP only has second resolution
+                QuizAttempt.completed_at: datetime.now(timezone.utc),
+                QuizAttempt.completion_timestamp: time.time()  # Unix timestamp with microseconds
+            }, synchronize_session=False)
             db.session.commit()
             
             return jsonify({
@@ -5762,18 +5931,22 @@ def submit_quiz_answer(attempt_id):
         selected_answer = data.get('answer')
         time_taken = data.get('time_taken', 0)
         
-        # Get performance manager for locking
-        perf_manager = app.extensions.get('quiz_performance')
-        
         attempt = QuizAttempt.query.get_or_404(attempt_id)
-        quiz = attempt.quiz
         
-        # Check if quiz is still active
-        if not quiz.is_active or quiz.is_ended:
+        # Check if quiz is still active (Redis-cached state; load the quiz only on a miss)
+        status = quiz_performance.get_quiz_status(attempt.quiz_id)
+        if status is None:
+            quiz = attempt.quiz
+            status = {'is_active': quiz.is_active, 'is_ended': quiz.is_ended, 'total_questions': quiz.total_questions}
+            quiz_performance.cache_quiz_status(quiz.id, quiz.is_active, quiz.is_ended, status['total_questions'])
+        
+        if not status['is_active'] or status['is_ended']:
             return jsonify({'success': False, 'error': 'Quiz is no longer active'}), 400
         
-        # Get current question
-        question = QuizQuestion.query.filter_by(
+        # Get current question (only the columns needed to grade it - no ORM instance)
+        question = db.session.query(
+            QuizQuestion.id, QuizQuestion.correct_answer, QuizQuestion.points
+        ).filter_by(
             quiz_id=attempt.quiz_id,
             question_order=attempt.current_question
         ).first()
@@ -5781,59 +5954,108 @@ def submit_quiz_answer(attempt_id):
         if not question:
             return jsonify({'success': False, 'error': 'Question not found'}), 404
         
-        # Use lock to prevent double submissions for high concurrency
-        if perf_manager:
-            answer_lock = perf_manager.get_answer_lock(attempt.id, question.id)
-            if not answer_lock.acquire(blocking=False):
-                return jsonify({
-                    'success': False, 
-                    'error': 'Answer submission in progress, please wait'
-                }), 429
-        else:
-            answer_lock = None
-        
-        try:
-            # Check if answer already exists (with database lock)
-            existing_answer = QuizAnswer.query.filter_by(
-                attempt_id=attempt.id,
-                question_id=question.id
-            ).with_for_update().first()
-            
-            if existing_answer:
-                return jsonify({'success': False, 'error': 'Answer already submitted'}), 400
-            
-            # Create answer record
-            is_correct = selected_answer == question.correct_answer
-            answer = QuizAnswer(
-                attempt_id=attempt.id,
-                question_id=question.id,
-                selected_answer=selected_answer,
-                is_correct=is_correct,
-                time_taken=time_taken
-            )
-            
-            db.session.add(answer)
-            
-            # Update score and move to next question
-            if is_correct:
-                attempt.score += question.points
-            
-            attempt.current_question += 1
-            attempt.total_time_taken += time_taken
-            
-            db.session.commit()
-            
+        # Fast-path reject for a duplicate already in flight on any worker
+        if not quiz_performance.claim_answer_submission(attempt.id, question.id):
             return jsonify({
-                'success': True,
-                'correct': is_correct,
-                'correct_answer': question.correct_answer,
-                'current_score': attempt.score
-            })
+                'success': False, 
+                'error': 'Answer submission in progress, please wait'
+            }), 429
+        
+        is_correct = selected_answer == question.correct_answer
+        points_gained = (question.points or 0) if is_correct else 0
+        
+        # Record the answer and advance the attempt. Score/counters are updated in SQL
+        # (score = score + :n) so concurrent writes can't lose an increment, and the
+        # unique (attempt_id, question_id) index rejects double submissions.
+        # Answering the last question also finalizes the attempt in the same UPDATE;
+        # the answer time comes from the database clock (NOW()), while completed_at keeps a
+        # Python timestamp so SQLite's second-resolution clock doesn't lose the tie-break
+        total_questions = status['total_questions']
+        completion_time = datetime.now(timezone.utc)
+        completion_timestamp = time.time()  # Unix timestamp with microseconds
+        # The per-answer lock serializes the row check and the write within this process;
+        # the Redis claim and the unique index cover other workers
+        with quiz_performance.get_answer_lock(attempt.id, question.id):
+            try:
+                # Row check for databases where /admin/migrate/indexes hasn't created the
+                # unique index yet (and for deployments without Redis)
+                if db.session.query(QuizAnswer.id).filter_by(
+                    attempt_id=attempt.id, question_id=question.id
+                ).first():
+                    quiz_performance.release_answer_submission(attempt.id, question.id)
+                    return jsonify({'success': False, 'error': 'Answer already submitted'}), 400
             
-        finally:
-            # Always release the lock
-            if answer_lock:
-                answer_lock.release()
+                if IS_POSTGRES:
+                    # Single round trip: the answer INSERT rides along as a writable CTE
+                    current_score = db.session.execute(db.text("""
+                        WITH ins AS (
+                            INSERT INTO quiz_answers (attempt_id, question_id, selected_answer, is_correct, time_taken, answered_at)
+                            VALUES (:attempt_id, :question_id, :selected_answer, :is_correct, :time_taken, NOW())
+                        )
+                        UPDATE quiz_attempts
+                        SET score = score + :points_gained,
+                            current_question = current_question + 1,
+                            total_time_taken = total_time_taken + :time_taken,
+                            is_completed = (current_question + 1 > :total_questions),
+                            completed_at = CASE WHEN current_question + 1 > :total_questions
+                                                THEN :completed_at ELSE completed_at END,
+                            completion_timestamp = CASE WHEN current_question + 1 > :total_questions
+                                                        THEN :completion_timestamp ELSE completion_timestamp END
+                        WHERE id = :attempt_id
+                        RETURNING score
+                    """), {
+                        'attempt_id': attempt.id,
+                        'question_id': question.id,
+                        'selected_answer': selected_answer,
+                        'is_correct': is_correct,
+                        'time_taken': time_taken,
+                        'points_gained': points_gained,
+                        'total_questions': total_questions,
+                        'completed_at': completion_time,
+                        'completion_timestamp': completion_timestamp
+                    }).scalar()
+                else:
+                    db.session.add(QuizAnswer(
+                        attempt_id=attempt.id,
+                        question_id=question.id,
+                        selected_answer=selected_answer,
+                        is_correct=is_correct,
+                        time_taken=time_taken,
+                        answered_at=db.func.now()
+                    ))
+                    finished = QuizAttempt.current_question + 1 > total_questions
+                    current_score = db.session.execute(
+                        db.update(QuizAttempt)
+                        .where(QuizAttempt.id == attempt.id)
+                        .values(
+                            score=QuizAttempt.score + points_gained,
+                            current_question=QuizAttempt.current_question + 1,
+                            total_time_taken=QuizAttempt.total_time_taken + time_taken,
+                            is_completed=finished,
+                            completed_at=db.case((finished, completion_time), else_=QuizAttempt.completed_at),
+                            completion_timestamp=db.case((finished, completion_timestamp), else_=QuizAttempt.completion_timestamp)
+                        )
+                        .returning(QuizAttempt.score)
+                        .execution_options(synchronize_session=False)
+                    ).scalar()
+            
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                quiz_performance.release_answer_submission(attempt.id, question.id)
+                return jsonify({'success': False, 'error': 'Answer already submitted'}), 400
+            except Exception:
+                # Let a legitimate retry through instead of answering 429 until the claim expires
+                db.session.rollback()
+                quiz_performance.release_answer_submission(attempt.id, question.id)
+                raise
+        
+        return jsonify({
+            'success': True,
+            'correct': is_correct,
+            'correct_answer': question.correct_answer,
+            'current_score': current_score
+        })
         
     except Exception as e:
         db.session.rollback()
@@ -5842,8 +6064,7 @@ def submit_quiz_answer(attempt_id):
 @app.route('/event/<int:event_id>/quiz/leaderboard')
 def quiz_leaderboard(event_id):
     """Show quiz leaderboard with mandatory feedback support"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('Quiz not found.', 'error')
@@ -5868,8 +6089,7 @@ def quiz_leaderboard(event_id):
 @require_admin
 def quiz_gamemaster(event_id):
     """Game master dashboard with live updates"""
-    event = Event.query.get_or_404(event_id)
-    quiz = Quiz.query.filter_by(event_id=event_id).first()
+    event, quiz = _get_event_and_quiz(event_id)
     
     if not quiz:
         flash('Quiz not found.', 'error')
@@ -5882,33 +6102,44 @@ def quiz_live_leaderboard_api(quiz_id):
     """API endpoint for live leaderboard updates"""
     try:
         quiz = Quiz.query.get_or_404(quiz_id)
-        attempts = quiz.live_leaderboard_data
         
+        # Polls share a short-lived Redis snapshot; rebuilt from SQL on a miss
+        entries = quiz_performance.get_cached_leaderboard(quiz_id)
+        if entries is None:
+            # Top 50 ranked in SQL (ROW_NUMBER ... LIMIT 50), in-progress attempts included
+            entries = [{
+                'rank': row.rank,
+                'participant_name': row.participant_name,
+                'participant_email': row.participant_email,
+                'score': row.score,
+                'current_question': row.current_question,
+                'total_time_taken': row.total_time_taken,
+                'is_completed': row.is_completed,
+                # Include milliseconds for completed attempts
+                'completion_time': row.completed_at.strftime('%H:%M:%S.%f')[:-3] if row.completed_at else None,
+                'completion_timestamp': row.completion_timestamp
+            } for row in Quiz.leaderboard_rows(quiz_id, live=True)]
+            quiz_performance.cache_leaderboard(quiz_id, entries)
+        
+        total_questions = quiz.total_questions
         leaderboard_data = []
-        for i, attempt in enumerate(attempts, 1):
-            participant = attempt.participant
-            
+        for entry in entries:
             # Calculate progress percentage
-            progress = (attempt.current_question - 1) / max(quiz.total_questions, 1) * 100
-            
-            # Format completion time with microseconds for completed attempts
-            completion_time_formatted = None
-            if attempt.completed_at:
-                completion_time_formatted = attempt.completed_at.strftime('%H:%M:%S.%f')[:-3]  # Include milliseconds
+            progress = (entry['current_question'] - 1) / max(total_questions, 1) * 100
             
             leaderboard_data.append({
-                'rank': i,
-                'participant_name': participant.name,
-                'participant_email': participant.email,
-                'score': attempt.score,
-                'current_question': attempt.current_question,
-                'total_questions': quiz.total_questions,
+                'rank': entry['rank'],
+                'participant_name': entry['participant_name'],
+                'participant_email': entry['participant_email'],
+                'score': entry['score'],
+                'current_question': entry['current_question'],
+                'total_questions': total_questions,
                 'progress_percentage': round(progress, 1),
-                'total_time_taken': round(attempt.total_time_taken, 3),  # Show seconds with 3 decimal places
-                'is_completed': attempt.is_completed,
-                'completion_time': completion_time_formatted,
-                'completion_timestamp': attempt.completion_timestamp if attempt.completion_timestamp else None,
-                'status': 'Completed' if attempt.is_completed else f'Question {attempt.current_question}/{quiz.total_questions}'
+                'total_time_taken': round(entry['total_time_taken'], 3),  # Show seconds with 3 decimal places
+                'is_completed': entry['is_completed'],
+                'completion_time': entry['completion_time'],
+                'completion_timestamp': entry['completion_timestamp'] if entry['completion_timestamp'] else None,
+                'status': 'Completed' if entry['is_completed'] else f"Question {entry['current_question']}/{total_questions}"
             })
         
         return jsonify({
@@ -5919,8 +6150,9 @@ def quiz_live_leaderboard_api(quiz_id):
                 'is_active': quiz.is_active,
                 'is_started': quiz.is_started,
                 'is_ended': quiz.is_ended,
-                'total_questions': quiz.total_questions,
-                'current_participants': quiz.current_participants,
+                'total_questions': total_questions,
+                # Counted separately - the cached snapshot only holds the top 50
+                'current_participants': QuizAttempt.query.filter_by(quiz_id=quiz_id).count(),
                 'participant_limit': quiz.participant_limit
             },
             'leaderboard': leaderboard_data,
@@ -5981,30 +6213,41 @@ def quiz_live_stats(quiz_id):
     try:
         quiz = Quiz.query.get_or_404(quiz_id)
         
-        # Get live stats from Redis (if available)
-        live_stats = quiz_stats.get_live_stats(quiz_id)
-        
-        # Get database stats for backup
-        total_attempts = QuizAttempt.query.filter_by(quiz_id=quiz_id).count()
-        completed_attempts = QuizAttempt.query.filter_by(quiz_id=quiz_id, is_completed=True).count()
+        # Get live stats and the cached database stats from Redis (if available) in one
+        # pipelined round-trip; the aggregate is cached briefly so many dashboards
+        # polling at once don't each hit the database
+        live_stats, db_stats = quiz_stats.get_live_snapshot(quiz_id)
+        if db_stats is None:
+            question_count = db.select(db.func.count(QuizQuestion.id)).where(
+                QuizQuestion.quiz_id == quiz_id
+            ).scalar_subquery()
+            total_attempts, completed_attempts, avg_score_result, total_questions = db.session.query(
+                db.func.count(QuizAttempt.id),
+                db.func.count(db.case((QuizAttempt.is_completed == True, 1))),
+                db.func.avg(db.case((QuizAttempt.is_completed == True, QuizAttempt.score))),
+                question_count
+            ).filter(QuizAttempt.quiz_id == quiz_id).one()
+            db_stats = {
+                'total_attempts': total_attempts,
+                'completed_attempts': completed_attempts,
+                'average_score': round(float(avg_score_result), 2) if avg_score_result else 0,
+                'total_questions': total_questions
+            }
+            quiz_performance.cache_live_stats(quiz_id, db_stats)
         
-        # Average score calculation
-        from sqlalchemy import func
-        avg_score_result = db.session.query(func.avg(QuizAttempt.score)).filter_by(
-            quiz_id=quiz_id, 
-            is_completed=True
-        ).scalar()
-        avg_score = round(float(avg_score_result), 2) if avg_score_result else 0
+        total_attempts = db_stats['total_attempts']
+        completed_attempts = db_stats['completed_attempts']
+        avg_score = db_stats['average_score']
         
         stats = {
             'quiz_id': quiz_id,
             'quiz_title': quiz.title,
             'is_active': quiz.is_active,
-            'total_questions': quiz.total_questions,
+            'total_questions': db_stats['total_questions'],
             'participant_limit': quiz.participant_limit,
-            'current_participants': quiz.current_participants,
-            'available_spots': quiz.available_spots,
-            'is_full': quiz.is_full,
+            'current_participants': total_attempts,
+            'available_spots': max(0, quiz.participant_limit - total_attempts),
+            'is_full': total_attempts >= quiz.participant_limit,
             'live_stats': live_stats,
             'database_stats': {
                 'total_attempts': total_attempts,
@@ -6013,7 +6256,7 @@ def quiz_live_stats(quiz_id):
                 'average_score': avg_score
             },
             'performance_metrics': {
-                'concurrent_submissions': len(quiz_performance.answer_locks) if quiz_performance else 0,
+                'concurrent_submissions': quiz_performance.active_answer_locks() if quiz_performance else 0,
                 'cache_available': quiz_performance.redis_client is not None if quiz_performance else False
             }
         }
@@ -6023,41 +6266,55 @@ def quiz_live_stats(quiz_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/event/<int:event_id>/quiz/qr')
-@require_admin
-def generate_quiz_qr(event_id):
-    """Generate QR code for quiz joining"""
+# Reusable QRCode builders for cache misses in _qr_png (cleared before each use)
+_qr_pool = LifoQueue(maxsize=4)
+
+@lru_cache(maxsize=256)
+def _qr_png(url):
+    """Render a QR code for url as PNG bytes (memoized - the join URL per event never changes)"""
     try:
-        event = Event.query.get_or_404(event_id)
-        quiz = Quiz.query.filter_by(event_id=event_id).first()
-        
-        # Always create QR code for the quiz game level (play route)
-        # Even if quiz doesn't exist yet, participants should land on the quiz play page
-        quiz_join_url = url_for('play_quiz', event_id=event_id, _external=True)
-        
-        # Generate QR code
+        qr = _qr_pool.get_nowait()
+        qr.clear()
+        qr.version = 1  # make(fit=True) may have grown it for a longer URL
+    except Empty:
         qr = qrcode.QRCode(
             version=1,  # controls the size of the QR Code
             error_correction=qrcode.constants.ERROR_CORRECT_L,
             box_size=10,
             border=4,
         )
-        qr.add_data(quiz_join_url)
+    try:
+        qr.add_data(url)
         qr.make(fit=True)
         
-        # Create QR code image
+        # Create QR code image and convert to bytes
         img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to bytes
         img_io = BytesIO()
         img.save(img_io, 'PNG')
-        img_io.seek(0)
+        return img_io.getvalue()
+    finally:
+        try:
+            _qr_pool.put_nowait(qr)
+        except Full:
+            pass
+
+@app.route('/event/<int:event_id>/quiz/qr')
+@require_admin
+def generate_quiz_qr(event_id):
+    """Generate QR code for quiz joining"""
+    try:
+        # Only the event name is needed (for the filename) - the QR always points at the play route
+        event_name = db.first_or_404(db.select(Event.name).where(Event.id == event_id))
+        
+        # Always create QR code for the quiz game level (play route)
+        # Even if quiz doesn't exist yet, participants should land on the quiz play page
+        quiz_join_url = url_for('play_quiz', event_id=event_id, _external=True)
         
         return Response(
-            img_io.getvalue(),
+            _qr_png(quiz_join_url),
             mimetype='image/png',
             headers={
-                'Content-Disposition': f'inline; filename=quiz_qr_{event.title.replace(" ", "_")}.png',
+                'Content-Disposition': f'inline; filename=quiz_qr_{event_name.replace(" ", "_")}.png',
                 'Cache-Control': 'no-cache, no-store, must-revalidate',
                 'Pragma': 'no-cache',
                 'Expires': '0'
@@ -6065,19 +6322,7 @@ def generate_quiz_qr(event_id):
         )
         
     except Exception as e:
-        # Create a fallback QR with quiz play URL (not dashboard)
-        try:
-            fallback_url = url_for('play_quiz', event_id=event_id, _external=True)
-            qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-            qr.add_data(fallback_url)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            img_io = BytesIO()
-            img.save(img_io, 'PNG')
-            img_io.seek(0)
-            return Response(img_io.getvalue(), mimetype='image/png')
-        except:
-            return redirect(url_for('play_quiz', event_id=event_id))
+        return redirect(url_for('play_quiz', event_id=event_id))
 
 @app.route('/debug/test_certificate_resend/<int:participant_id>')
 def debug_test_certificate_resend(participant_id):
@@ -6311,7 +6556,6 @@ def debug_email_config_v2():
         
         # Test SMTP connection
         try:
-            from flask_mail import Message
             test_msg = Message(
                 subject="Test Connection",
                 sender=app.config['MAIL_DEFAULT_SENDER'],
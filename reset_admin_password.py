@@ -1,18 +1,23 @@
 """
 Script to generate a bcrypt password hash for resetting admin password.
 Run this script to get a hash, then update it in Supabase.
+
+Usage: python reset_admin_password.py [NEW_PASSWORD] [ROUNDS]
+(or set NEW_PASSWORD / BCRYPT_ROUNDS in the environment)
 """
-from flask_bcrypt import Bcrypt
-from flask import Flask
+import os
+import sys
+
+import bcrypt
 
-app = Flask(__name__)
-bcrypt = Bcrypt(app)
+# Desired password: first argument, then NEW_PASSWORD env var, then the default
+NEW_PASSWORD = sys.argv[1] if len(sys.argv) > 1 else os.getenv('NEW_PASSWORD', 'Admin@123')
 
-# Change this to your desired password
-NEW_PASSWORD = "Admin@123"
+# bcrypt cost factor - 12 matches Flask-Bcrypt's default used by the app
+ROUNDS = int(sys.argv[2] if len(sys.argv) > 2 else os.getenv('BCRYPT_ROUNDS', '12'))
 
-# Generate the hash
-password_hash = bcrypt.generate_password_hash(NEW_PASSWORD).decode('utf-8')
+# Generate the hash (no Flask app needed - Flask-Bcrypt hashes are plain bcrypt)
+password_hash = bcrypt.hashpw(NEW_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=ROUNDS)).decode('utf-8')
 
 print("\n" + "="*60)
 print("PASSWORD RESET HELPER")
@@ -1,7 +1,6 @@
 # Quiz Performance Optimizations for High Concurrency
 import time
 from functools import wraps
-from flask import current_app
 try:
     import redis
     REDIS_AVAILABLE = True
@@ -10,16 +9,57 @@ except ImportError:
     REDIS_AVAILABLE = False
 
 from threading import Lock
+from collections import defaultdict
+from uuid import uuid4
+from weakref import WeakValueDictionary
 import json
 
+# Sliding-window rate limit in one atomic round-trip: drop entries older than the window,
+# count what's left and record this request only if it's under the limit.
+# KEYS[1] = limiter key, ARGV = now_ms, window_ms, limit, unique member. Returns 1 if allowed.
+RATE_LIMIT_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Answer locks are spread over this many independently locked shards (power of two)
+LOCK_SHARDS = 64
+
+class AnswerLock:
+    """Per-answer lock; a thin wrapper because threading.Lock can't be weakly referenced"""
+    __slots__ = ('_lock', '__weakref__')
+    
+    def __init__(self):
+        self._lock = Lock()
+    
+    def acquire(self, blocking=True, timeout=-1):
+        return self._lock.acquire(blocking, timeout)
+    
+    def release(self):
+        self._lock.release()
+    
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
 class QuizPerformanceManager:
     """Manages quiz performance optimizations for high concurrency"""
     
     def __init__(self, app=None, redis_client=None):
         self.app = app
         self.redis_client = redis_client
-        self.answer_locks = {}
-        self.submission_lock = Lock()
+        self.rate_limit_script = None
+        # Sharded lock table: each shard has its own mutex, and entries vanish as soon as
+        # no request holds a reference to them (no periodic cleanup needed)
+        self._lock_shards = [(Lock(), WeakValueDictionary()) for _ in range(LOCK_SHARDS)]
         
         if app:
             self.init_app(app)
@@ -35,6 +75,8 @@ class QuizPerformanceManager:
                 self.redis_client = redis.from_url(redis_url, decode_responses=True)
                 # Test connection
                 self.redis_client.ping()
+                # Script object runs EVALSHA and reloads the script on NOSCRIPT
+                self.rate_limit_script = self.redis_client.register_script(RATE_LIMIT_LUA)
                 app.logger.info("Redis connected for quiz caching")
             except Exception as e:
                 app.logger.info(f"Redis not available ({str(e)}), using in-memory caching")
@@ -64,59 +106,178 @@ class QuizPerformanceManager:
                 pass
         return None
     
-    def get_answer_lock(self, attempt_id, question_id):
-        """Get lock for specific answer submission to prevent double submissions"""
-        lock_key = f"{attempt_id}_{question_id}"
-        if lock_key not in self.answer_locks:
-            with self.submission_lock:
-                if lock_key not in self.answer_locks:
-                    self.answer_locks[lock_key] = Lock()
-        return self.answer_locks[lock_key]
-    
-    def cleanup_old_locks(self):
-        """Clean up old locks to prevent memory leaks"""
-        # This should be called periodically
-        if len(self.answer_locks) > 1000:
-            # Keep only recent 500 locks
-            keys = list(self.answer_locks.keys())
-            with self.submission_lock:
-                for key in keys[:-500]:
-                    self.answer_locks.pop(key, None)
-
-def prevent_double_submission(f):
-    """Decorator to prevent double submission of answers"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        from flask import request, jsonify
-        
-        # Extract attempt_id from route or request
-        attempt_id = kwargs.get('attempt_id') or request.get_json().get('attempt_id')
-        question_data = request.get_json()
-        question_id = question_data.get('question_id')
-        
-        if not attempt_id or not question_id:
-            return f(*args, **kwargs)
-        
-        # Get performance manager
-        perf_manager = current_app.extensions.get('quiz_performance')
-        if not perf_manager:
-            return f(*args, **kwargs)
+    def cache_live_stats(self, quiz_id, stats, expire_time=2):
+        """Cache the quiz attempt aggregates polled by live dashboards"""
+        if self.redis_client:
+            try:
+                key = f"quiz:{quiz_id}:live_stats"
+                self.redis_client.setex(key, expire_time, json.dumps(stats))
+            except:
+                pass  # Fallback to no caching
+    
+    def get_cached_live_stats(self, quiz_id):
+        """Get cached quiz attempt aggregates"""
+        if self.redis_client:
+            try:
+                cached = self.redis_client.get(f"quiz:{quiz_id}:live_stats")
+                if cached:
+                    return json.loads(cached)
+            except:
+                pass
+        return None
+    
+    def cache_quiz_status(self, quiz_id, is_active, is_ended, total_questions, expire_time=300):
+        """Cache the quiz state checked on every answer submission"""
+        if self.redis_client:
+            try:
+                key = f"quiz:{quiz_id}:status"
+                pipe = self.redis_client.pipeline()
+                pipe.hset(key, mapping={
+                    'quiz_id': quiz_id,
+                    'is_active': int(bool(is_active)),
+                    'is_ended': int(bool(is_ended)),
+                    'total_questions': total_questions
+                })
+                pipe.expire(key, expire_time)
+                pipe.execute()
+            except:
+                pass  # Fallback to no caching
+    
+    def get_quiz_status(self, quiz_id):
+        """Get cached quiz state, or None on a cache miss"""
+        if self.redis_client:
+            try:
+                cached = self.redis_client.hgetall(f"quiz:{quiz_id}:status")
+                if cached and 'total_questions' in cached:
+                    return {
+                        'is_active': cached.get('is_active') == '1',
+                        'is_ended': cached.get('is_ended') == '1',
+                        'total_questions': int(cached['total_questions'])
+                    }
+            except:
+                pass
+        return None
+    
+    def invalidate_quiz_status(self, quiz_id):
+        """Drop cached quiz state (quiz reset/deleted, questions changed)"""
+        if self.redis_client:
+            try:
+                self.redis_client.delete(f"quiz:{quiz_id}:status")
+            except:
+                pass
+    
+    def cache_leaderboard(self, quiz_id, entries, expire_time=2):
+        """Cache the ranked live leaderboard polled by the game master view.
         
-        # Use lock for this specific answer submission
-        answer_lock = perf_manager.get_answer_lock(attempt_id, question_id)
+        A short-lived snapshot rather than a per-answer materialized board: every
+        poll within the TTL shares one SQL rebuild and nothing can go stale for longer.
+        """
+        if self.redis_client:
+            try:
+                self.redis_client.setex(f"quiz:{quiz_id}:leaderboard", expire_time, json.dumps(entries))
+            except:
+                pass  # Fallback to no caching
+    
+    def get_cached_leaderboard(self, quiz_id):
+        """Get the cached ranked leaderboard, or None on a miss"""
+        if self.redis_client:
+            try:
+                cached = self.redis_client.get(f"quiz:{quiz_id}:leaderboard")
+                if cached:
+                    return json.loads(cached)
+            except:
+                pass
+        return None
+    
+    def invalidate_leaderboard(self, quiz_id):
+        """Drop the cached leaderboard (quiz reset/deleted)"""
+        if self.redis_client:
+            try:
+                self.redis_client.delete(f"quiz:{quiz_id}:leaderboard")
+            except:
+                pass
+    
+    def claim_quiz_spot(self, quiz_id, limit, count_attempts, expire_time=86400):
+        """Atomically take one participant slot (Redis INCR on quiz:{id}:joined).
         
-        if not answer_lock.acquire(blocking=False):
-            return jsonify({
-                'success': False, 
-                'error': 'Answer submission in progress, please wait'
-            }), 429
+        Returns False - with the slot given back - when the quiz is already full.
+        count_attempts() returns the database attempt count including the new one;
+        it seeds the counter on a miss and is the check used without Redis.
+        """
+        if self.redis_client:
+            try:
+                key = f"quiz:{quiz_id}:joined"
+                if not self.redis_client.exists(key):
+                    self.redis_client.set(key, count_attempts() - 1, nx=True, ex=expire_time)
+                if self.redis_client.incr(key) > limit:
+                    self.redis_client.decr(key)
+                    return False
+                return True
+            except:
+                pass  # Fall back to counting in the database
+        return count_attempts() <= limit
+    
+    def release_quiz_spot(self, quiz_id):
+        """Give back a slot taken by claim_quiz_spot (join rolled back)"""
+        if self.redis_client:
+            try:
+                self.redis_client.decr(f"quiz:{quiz_id}:joined")
+            except:
+                pass
+    
+    def reset_quiz_spots(self, quiz_id):
+        """Drop the joined counter so it is re-seeded from the database"""
+        if self.redis_client:
+            try:
+                self.redis_client.delete(f"quiz:{quiz_id}:joined")
+            except:
+                pass
+    
+    def allow_request(self, key, limit, window_seconds=60):
+        """Sliding-window rate limit check (single EVALSHA); raises if Redis is unavailable"""
+        if self.rate_limit_script is None:
+            self.rate_limit_script = self.redis_client.register_script(RATE_LIMIT_LUA)
+        now_ms = int(time.time() * 1000)
+        return bool(self.rate_limit_script(
+            keys=[key], args=[now_ms, window_seconds * 1000, limit, f"{now_ms}-{uuid4().hex}"]
+        ))
+    
+    def claim_answer_submission(self, attempt_id, question_id, ttl=5):
+        """Claim an answer slot across all workers (Redis SET NX).
         
-        try:
-            return f(*args, **kwargs)
-        finally:
-            answer_lock.release()
+        Returns False if another request for the same attempt/question is already
+        in flight. Without Redis this always returns True and the database checks
+        in submit_quiz_answer are the guard. Callers release the claim on failure.
+        """
+        if self.redis_client:
+            try:
+                key = f"quiz:answer:{attempt_id}:{question_id}"
+                return bool(self.redis_client.set(key, 1, nx=True, ex=ttl))
+            except:
+                pass  # Fall back to the database constraint
+        return True
     
-    return decorated_function
+    def release_answer_submission(self, attempt_id, question_id):
+        """Give back a claim taken by claim_answer_submission (submission failed)"""
+        if self.redis_client:
+            try:
+                self.redis_client.delete(f"quiz:answer:{attempt_id}:{question_id}")
+            except:
+                pass
+    
+    def get_answer_lock(self, attempt_id, question_id):
+        """Get lock for specific answer submission to prevent double submissions"""
+        lock_key = f"{attempt_id}_{question_id}"
+        shard_lock, shard = self._lock_shards[hash(lock_key) & (LOCK_SHARDS - 1)]
+        with shard_lock:
+            answer_lock = shard.get(lock_key)
+            if answer_lock is None:
+                answer_lock = shard[lock_key] = AnswerLock()
+        return answer_lock
+    
+    def active_answer_locks(self):
+        """Number of answer locks currently referenced by in-flight submissions"""
+        return sum(len(shard) for _, shard in self._lock_shards)
 
 def rate_limit_quiz_joins(max_joins_per_minute=30):
     """Rate limit quiz joins to prevent system overload"""
@@ -132,20 +293,16 @@ def rate_limit_quiz_joins(max_joins_per_minute=30):
             
             # Get client IP
             client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            key = f"rate_limit:quiz_join:{client_ip}"
+            key = f"rate_limit:quiz_join:{client_ip}:window"  # sorted set (old plain counter key was a string)
             
             try:
-                current_joins = perf_manager.redis_client.get(key)
-                if current_joins and int(current_joins) >= max_joins_per_minute:
+                # Atomic sliding 60s window - one round-trip, no GET/INCR race
+                if not perf_manager.allow_request(key, max_joins_per_minute):
                     return jsonify({
                         'success': False,
                         'error': 'Too many quiz join attempts. Please wait a moment.'
                     }), 429
                 
-                # Increment counter
-                perf_manager.redis_client.incr(key)
-                perf_manager.redis_client.expire(key, 60)  # Reset after 1 minute
-                
             except Exception as e:
                 # Continue without rate limiting if Redis fails
                 current_app.logger.warning(f"Rate limiting failed: {str(e)}")
@@ -171,41 +328,48 @@ class QuizStatsCollector:
             timestamp = int(time.time())
             key = f"quiz:{quiz_id}:stats:{event_type}"
             
-            # Use sorted set to track events with timestamps
-            self.redis_client.zadd(key, {str(timestamp): timestamp})
-            
-            # Keep only last hour of data
-            cutoff = timestamp - 3600
-            self.redis_client.zremrangebyscore(key, 0, cutoff)
+            # Use sorted set to track events with timestamps, keeping only the last hour
+            # of data - both commands go out in one pipelined round-trip
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zadd(key, {str(timestamp): timestamp})
+            pipe.zremrangebyscore(key, 0, timestamp - 3600)
+            pipe.execute()
             
         except:
             pass
     
     def get_live_stats(self, quiz_id):
         """Get live quiz statistics"""
+        return self.get_live_snapshot(quiz_id)[0]
+    
+    def get_live_snapshot(self, quiz_id):
+        """Get live quiz statistics plus the cached attempt aggregates in one Redis round-trip
+        
+        Returns (live_stats, cached_db_stats); cached_db_stats is None on a cache miss.
+        """
         if not self.redis_client:
-            return {'active_players': 0, 'total_joins': 0}
+            return {'active_players': 0, 'total_joins': 0}, None
         
         try:
             current_time = int(time.time())
-            
-            # Get joins in last 5 minutes (active players)
-            active_cutoff = current_time - 300
             join_key = f"quiz:{quiz_id}:stats:join"
-            active_players = self.redis_client.zcount(join_key, active_cutoff, current_time)
             
-            # Get total joins in last hour
-            hour_cutoff = current_time - 3600
-            total_joins = self.redis_client.zcount(join_key, hour_cutoff, current_time)
+            pipe = self.redis_client.pipeline(transaction=False)
+            # Joins in last 5 minutes (active players) and in the last hour
+            pipe.zcount(join_key, current_time - 300, current_time)
+            pipe.zcount(join_key, current_time - 3600, current_time)
+            pipe.get(f"quiz:{quiz_id}:live_stats")
+            active_players, total_joins, cached = pipe.execute()
             
-            return {
+            live_stats = {
                 'active_players': active_players,
                 'total_joins': total_joins,
                 'timestamp': current_time
             }
+            return live_stats, json.loads(cached) if cached else None
             
         except:
-            return {'active_players': 0, 'total_joins': 0}
+            return {'active_players': 0, 'total_joins': 0}, None
 
 # Database query optimizations
 class QuizQueryOptimizer:
@@ -214,7 +378,7 @@ class QuizQueryOptimizer:
     @staticmethod
     def get_quiz_with_questions(quiz_id):
         """Get quiz with all questions in single query"""
-        from index import Quiz, QuizQuestion
+        from index import Quiz
         from sqlalchemy.orm import joinedload
         
         return Quiz.query.options(
@@ -224,7 +388,7 @@ class QuizQueryOptimizer:
     @staticmethod
     def get_attempt_with_answers(attempt_id):
         """Get attempt with all answers in single query"""
-        from index import QuizAttempt, QuizAnswer
+        from index import QuizAttempt
         from sqlalchemy.orm import joinedload
         
         return QuizAttempt.query.options(
@@ -236,48 +400,53 @@ class QuizQueryOptimizer:
         """Bulk create quiz questions for better performance"""
         from index import db, QuizQuestion
         
-        questions = []
-        for i, q_data in enumerate(questions_data, 1):
-            question = QuizQuestion(
-                quiz_id=quiz_id,
-                question_text=q_data['question'],
-                option_a=q_data.get('option_a', ''),
-                option_b=q_data.get('option_b', ''),
-                option_c=q_data.get('option_c', ''),
-                option_d=q_data.get('option_d', ''),
-                correct_answer=q_data['correct_answer'],
-                question_order=i,
-                points=q_data.get('points', 1)
-            )
-            questions.append(question)
+        rows = [
+            {
+                'quiz_id': quiz_id,
+                'question_text': q_data['question'],
+                'option_a': q_data.get('option_a', ''),
+                'option_b': q_data.get('option_b', ''),
+                'option_c': q_data.get('option_c', ''),
+                'option_d': q_data.get('option_d', ''),
+                'correct_answer': q_data['correct_answer'],
+                'question_order': i,
+                'points': q_data.get('points', 1)
+            }
+            for i, q_data in enumerate(questions_data, 1)
+        ]
+        if not rows:
+            return 0
         
-        # Bulk insert
-        db.session.bulk_save_objects(questions)
+        # Single multi-row INSERT through Core - no ORM instances are built
+        db.session.execute(QuizQuestion.__table__.insert().values(rows))
         db.session.commit()
         
-        return len(questions)
+        return len(rows)
 
 # WebSocket support for real-time updates (optional)
 class QuizWebSocketManager:
     """Manage WebSocket connections for real-time quiz updates"""
     
     def __init__(self):
-        self.quiz_rooms = {}  # quiz_id -> set of participant_ids
+        self.quiz_rooms = defaultdict(set)  # quiz_id -> set of participant_ids
+        self._room_locks = defaultdict(Lock)  # quiz_id -> lock guarding that room only
     
     def join_quiz_room(self, quiz_id, participant_id):
         """Add participant to quiz room"""
-        if quiz_id not in self.quiz_rooms:
-            self.quiz_rooms[quiz_id] = set()
-        self.quiz_rooms[quiz_id].add(participant_id)
+        with self._room_locks[quiz_id]:
+            self.quiz_rooms[quiz_id].add(participant_id)
     
     def leave_quiz_room(self, quiz_id, participant_id):
         """Remove participant from quiz room"""
-        if quiz_id in self.quiz_rooms:
-            self.quiz_rooms[quiz_id].discard(participant_id)
-            if not self.quiz_rooms[quiz_id]:
-                del self.quiz_rooms[quiz_id]
+        with self._room_locks[quiz_id]:
+            participants = self.quiz_rooms.get(quiz_id)
+            if participants is not None:
+                participants.discard(participant_id)
+                if not participants:
+                    del self.quiz_rooms[quiz_id]
     
     def broadcast_to_quiz(self, quiz_id, message):
         """Broadcast message to all participants in quiz"""
-        participants = self.quiz_rooms.get(quiz_id, set())
-        return list(participants)  # Return list of participants to notify
\ No newline at end of file
+        with self._room_locks[quiz_id]:
+            # Snapshot so concurrent joins/leaves can't change the set mid-iteration
+            return list(self.quiz_rooms.get(quiz_id, ()))  # Return list of participants to notify
@@ -1,9 +1,10 @@
 import os
 import uuid
+import logging
 import base64
-from werkzeug.utils import secure_filename
 import requests
-from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Content type mapping
 CONTENT_TYPES = {
@@ -14,6 +15,9 @@ CONTENT_TYPES = {
     'webp': 'image/webp',
 }
 
+# Module logger: StorageManager is built at import time, outside any app context
+logger = logging.getLogger(__name__)
+
 
 class StorageManager:
     """Image storage manager with Supabase Storage (primary) and GitHub (fallback).
@@ -25,6 +29,17 @@ class StorageManager:
     BUCKET_NAME = 'event-assets'
     
     def __init__(self):
+        # One pooled HTTP session for every storage call: repeated uploads reuse the
+        # kept-alive TLS connection instead of a fresh handshake per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         self.storage_type = os.getenv('STORAGE_TYPE', 'supabase').lower()
         
         # Supabase config
@@ -39,16 +54,17 @@ class StorageManager:
         # Auto-detect best available storage
         if self.storage_type == 'supabase' and self.supabase_url and self.supabase_key:
             self.storage_type = 'supabase'
-            print(f"✅ Supabase Storage configured: {self.supabase_url}")
+            logger.info("✅ Supabase Storage configured: %s", self.supabase_url)
             self._ensure_bucket()
         elif self.github_token and self.github_repo:
             self.storage_type = 'github'
-            print(f"✅ GitHub storage configured: {self.github_repo}")
+            logger.info("✅ GitHub storage configured: %s", self.github_repo)
         else:
             self.storage_type = 'none'
-            print("⚠️ WARNING: No storage configured. Image uploads will fail.")
-            print("   Set SUPABASE_URL + SUPABASE_SERVICE_KEY (recommended)")
-            print("   Or set GITHUB_TOKEN + GITHUB_REPO (fallback)")
+            logger.warning(
+                "⚠️ No storage configured. Image uploads will fail. Set SUPABASE_URL + "
+                "SUPABASE_SERVICE_KEY (recommended) or GITHUB_TOKEN + GITHUB_REPO (fallback)"
+            )
     
     # ──────────────────────────────────────────────
     # Public API (same interface for all backends)
@@ -71,13 +87,11 @@ class StorageManager:
             elif self.storage_type == 'github':
                 return self._save_to_github(image_file, folder, unique_filename)
             else:
-                print("❌ No storage backend configured")
+                logger.error("❌ No storage backend configured")
                 return None
                 
         except Exception as e:
-            print(f"❌ Error saving image: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error saving image: %s", e)
             return None
     
     def delete_image(self, image_url):
@@ -89,11 +103,11 @@ class StorageManager:
             if self.storage_type == 'supabase':
                 return self._delete_from_supabase(image_url)
             else:
-                print("Image deletion not implemented for this storage backend")
+                logger.info("Image deletion not implemented for this storage backend")
                 return True
                 
         except Exception as e:
-            print(f"❌ Error deleting image: {e}")
+            logger.error("❌ Error deleting image: %s", e)
             return False
     
     # ──────────────────────────────────────────────
@@ -106,12 +120,12 @@ class StorageManager:
             url = f"{self.supabase_url}/storage/v1/bucket/{self.BUCKET_NAME}"
             headers = self._supabase_headers()
             
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = self.session.get(url, headers=headers, timeout=10)
             if resp.status_code == 200:
                 # Bucket exists — ensure it's public
                 data = resp.json()
                 if not data.get('public', False):
-                    update_resp = requests.put(
+                    update_resp = self.session.put(
                         url,
                         json={'public': True, 'file_size_limit': 10 * 1024 * 1024,
                               'allowed_mime_types': list(CONTENT_TYPES.values())},
@@ -119,7 +133,7 @@ class StorageManager:
                         timeout=10
                     )
                     if update_resp.status_code == 200:
-                        print(f"✅ Updated bucket '{self.BUCKET_NAME}' to public")
+                        logger.info("✅ Updated bucket '%s' to public", self.BUCKET_NAME)
                 return
             
             # Create bucket (public so images are accessible via URL)
@@ -131,15 +145,15 @@ class StorageManager:
                 'file_size_limit': 10 * 1024 * 1024,  # 10MB
                 'allowed_mime_types': list(CONTENT_TYPES.values())
             }
-            resp = requests.post(create_url, json=data, headers=headers, timeout=10)
+            resp = self.session.post(create_url, json=data, headers=headers, timeout=10)
             if resp.status_code in [200, 201]:
-                print(f"✅ Created storage bucket: {self.BUCKET_NAME}")
+                logger.info("✅ Created storage bucket: %s", self.BUCKET_NAME)
             elif resp.status_code == 409:
                 pass  # Already exists
             else:
-                print(f"⚠️ Bucket creation response: {resp.status_code} {resp.text}")
+                logger.warning("⚠️ Bucket creation response: %s %s", resp.status_code, resp.text)
         except Exception as e:
-            print(f"⚠️ Could not verify storage bucket: {e}")
+            logger.warning("⚠️ Could not verify storage bucket: %s", e)
     
     def _supabase_headers(self, content_type=None):
         """Build auth headers for Supabase Storage REST API."""
@@ -163,19 +177,21 @@ class StorageManager:
             
             url = f"{self.supabase_url}/storage/v1/object/{self.BUCKET_NAME}/{file_path}"
             headers = self._supabase_headers(content_type=content_type)
+            # Filenames are random and never overwritten, so the CDN can cache them for a year
+            headers['cache-control'] = 'max-age=31536000'
             
-            resp = requests.post(url, data=file_content, headers=headers, timeout=30)
+            resp = self.session.post(url, data=file_content, headers=headers, timeout=30)
             
             if resp.status_code in [200, 201]:
                 public_url = f"{self.supabase_url}/storage/v1/object/public/{self.BUCKET_NAME}/{file_path}"
-                print(f"✅ Uploaded to Supabase: {file_path}")
+                logger.info("✅ Uploaded to Supabase: %s", file_path)
                 return public_url
             else:
-                print(f"❌ Supabase upload failed: {resp.status_code} {resp.text}")
+                logger.error("❌ Supabase upload failed: %s %s", resp.status_code, resp.text)
                 return None
                 
         except Exception as e:
-            print(f"❌ Supabase upload error: {e}")
+            logger.error("❌ Supabase upload error: %s", e)
             return None
     
     def _delete_from_supabase(self, image_url):
@@ -184,7 +200,7 @@ class StorageManager:
             # Extract path from URL: .../object/public/event-assets/logos/abc.jpg → logos/abc.jpg
             marker = f"/object/public/{self.BUCKET_NAME}/"
             if marker not in image_url:
-                print(f"⚠️ URL doesn't match Supabase pattern: {image_url}")
+                logger.warning("⚠️ URL doesn't match Supabase pattern: %s", image_url)
                 return False
             
             file_path = image_url.split(marker)[1]
@@ -193,16 +209,16 @@ class StorageManager:
             headers = self._supabase_headers(content_type='application/json')
             data = {'prefixes': [file_path]}
             
-            resp = requests.delete(url, json=data, headers=headers, timeout=10)
+            resp = self.session.delete(url, json=data, headers=headers, timeout=10)
             if resp.status_code in [200, 204]:
-                print(f"✅ Deleted from Supabase: {file_path}")
+                logger.info("✅ Deleted from Supabase: %s", file_path)
                 return True
             else:
-                print(f"⚠️ Supabase delete response: {resp.status_code}")
+                logger.warning("⚠️ Supabase delete response: %s", resp.status_code)
                 return False
                 
         except Exception as e:
-            print(f"❌ Supabase delete error: {e}")
+            logger.error("❌ Supabase delete error: %s", e)
             return False
     
     # ──────────────────────────────────────────────
@@ -212,9 +228,10 @@ class StorageManager:
     def _save_to_github(self, image_file, folder, filename):
         """Save image to GitHub repository."""
         try:
-            file_content = image_file.read()
+            # Encode straight from the read buffer so the raw bytes are released right
+            # away (no long-lived raw copy alongside the base64 text)
+            content_b64 = base64.b64encode(image_file.read()).decode('ascii')
             image_file.seek(0)
-            content_b64 = base64.b64encode(file_content).decode('utf-8')
             
             file_path = f"static/uploads/{folder}/{filename}"
             api_url = f"https://api.github.com/repos/{self.github_repo}/contents/{file_path}"
@@ -230,18 +247,18 @@ class StorageManager:
                 'branch': self.github_branch,
             }
             
-            resp = requests.put(api_url, json=data, headers=headers, timeout=30)
+            resp = self.session.put(api_url, json=data, headers=headers, timeout=30)
             
             if resp.status_code in [200, 201]:
                 raw_url = f"https://raw.githubusercontent.com/{self.github_repo}/{self.github_branch}/{file_path}"
-                print(f"✅ Uploaded to GitHub: {file_path}")
+                logger.info("✅ Uploaded to GitHub: %s", file_path)
                 return raw_url
             else:
-                print(f"❌ GitHub upload failed: {resp.status_code} {resp.text}")
+                logger.error("❌ GitHub upload failed: %s %s", resp.status_code, resp.text)
                 return None
                 
         except Exception as e:
-            print(f"❌ GitHub upload error: {e}")
+            logger.error("❌ GitHub upload error: %s", e)
             return None
     
     # ──────────────────────────────────────────────
@@ -255,12 +272,12 @@ class StorageManager:
                 return False
             
             if '.' not in image_file.filename:
-                print("❌ File has no extension")
+                logger.warning("❌ File has no extension")
                 return False
                 
             file_extension = image_file.filename.rsplit('.', 1)[1].lower()
             if file_extension not in CONTENT_TYPES:
-                print(f"❌ Invalid file type: {file_extension}")
+                logger.warning("❌ Invalid file type: %s", file_extension)
                 return False
             
             image_file.seek(0, 2)
@@ -268,11 +285,11 @@ class StorageManager:
             image_file.seek(0)
             
             if file_size > 10 * 1024 * 1024:
-                print(f"❌ File too large: {file_size / 1024 / 1024:.1f}MB (max 10MB)")
+                logger.warning("❌ File too large: %.1fMB (max 10MB)", file_size / 1024 / 1024)
                 return False
                 
             return True
             
         except Exception as e:
-            print(f"❌ Validation error: {e}")
+            logger.error("❌ Validation error: %s", e)
             return False
\ No newline at end of file